@@ -6,9 +6,12 @@ variables with the YTDL_ prefix. Automatically creates required directories
 on module load.
 """
 
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings
 
+from app.fsutil import ensure_dir
+
 
 class Settings(BaseSettings):
     """
@@ -23,6 +26,8 @@ class Settings(BaseSettings):
         downloads_dir: Directory where downloaded files are saved.
         cookies_path: Path to the YouTube cookies.txt file for authentication.
         max_concurrent_downloads: Maximum number of simultaneous downloads.
+        metadata_workers: Threads for yt-dlp metadata extraction (video info,
+            playlists, formats, cookie checks).
         running_in_docker: Flag indicating if running inside Docker container.
     """
     app_name: str = "Corvid Cache"
@@ -30,15 +35,31 @@ class Settings(BaseSettings):
     downloads_dir: Path = Path("./downloads")
     cookies_path: Path = Path("./data/cookies.txt")
     max_concurrent_downloads: int = 1
+    metadata_workers: int = 8
     running_in_docker: bool = False
 
     class Config:
         env_prefix = "YTDL_"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings instance, parsing the environment once."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
+
+# Frequently used settings, bound once so hot paths avoid attribute lookups
+DOWNLOADS_DIR = settings.downloads_dir
+MAX_CONCURRENT_DOWNLOADS = settings.max_concurrent_downloads
 
 # Ensure required directories exist on startup
-settings.downloads_dir.mkdir(parents=True, exist_ok=True)
-Path("./data").mkdir(parents=True, exist_ok=True)
+ensure_dir(settings.downloads_dir)
+ensure_dir(Path("./data"))
+
+# Absolute downloads directory, resolved once (after it exists) for path
+# checks, and as a forward-slash string for matching stored file paths
+DOWNLOADS_DIR_RESOLVED = DOWNLOADS_DIR.resolve()
+DOWNLOADS_DIR_STR = str(DOWNLOADS_DIR_RESOLVED).replace("\\", "/")
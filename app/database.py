@@ -6,20 +6,83 @@ FastAPI dependency for database access.
 """
 
 import logging
-from sqlalchemy import text
+
+import orjson
+from sqlalchemy import bindparam, event, make_url, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.config import settings
+from app.config import settings, DOWNLOADS_DIR_STR
 
 logger = logging.getLogger(__name__)
 
-# Create async database engine
-engine = create_async_engine(settings.database_url, echo=False)
+
+def _json_dumps(value) -> str:
+    """Serialize a JSON column value with orjson."""
+    return orjson.dumps(value).decode()
+
+
+_is_sqlite = make_url(settings.database_url).get_backend_name() == "sqlite"
+
+# Create async database engine. aiosqlite defaults to NullPool for file
+# databases, which opens a new connection (and re-runs the pragmas below) on
+# every session; keep a pool of warm connections instead. It is sized for
+# the sessions that can be open at once: one per running download, one per
+# concurrent subscription check, plus API requests. The driver timeout
+# doubles as SQLite's busy timeout. JSON columns (download options,
+# settings values) are encoded with orjson instead of the stdlib json module.
+engine = create_async_engine(
+    settings.database_url,
+    echo=False,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    connect_args={"check_same_thread": False, "timeout": 30} if _is_sqlite else {},
+)
+
+# Pragmas applied to every new SQLite connection. WAL with synchronous=NORMAL
+# avoids an fsync per commit for the frequent download status updates, and
+# the larger page cache keeps the download/history tables in memory.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply performance pragmas to each new SQLite connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _reset_query_only(dbapi_connection, connection_record, connection_proxy):
+        """Make pooled connections writable again after a read-only session."""
+        if connection_record.info.pop("query_only", False):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only=OFF")
+            cursor.close()
 
 # Session factory for creating database sessions
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Session factory for read-only requests: nothing is ever added or dirtied,
+# so autoflush is pointless work on every query
+readonly_session = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+)
+
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy ORM models."""
@@ -40,91 +103,210 @@ async def get_db():
         yield session
 
 
+async def get_db_readonly():
+    """
+    FastAPI dependency that provides a read-only database session.
+
+    Used by endpoints that only query data. On SQLite the underlying
+    connection is switched to query_only mode for the request, so SQLite
+    never takes a write lock for it. The pool checkout hook switches the
+    connection back before it is handed to a writer.
+
+    Yields:
+        AsyncSession: Read-only database session for the current request.
+    """
+    async with readonly_session() as session:
+        if _is_sqlite:
+            conn = await session.connection()
+            raw = await conn.get_raw_connection()
+            await conn.execute(text("PRAGMA query_only=ON"))
+            raw.info["query_only"] = True
+        yield session
+
+
+# Current schema version. Bump this whenever a migration is added to
+# run_migrations() so existing databases pick it up on the next startup.
+SCHEMA_VERSION = 5
+
+# Columns added after the initial release: (table, column, column DDL)
+_COLUMN_MIGRATIONS = [
+    ("downloads", "source", "VARCHAR(50)"),
+    ("downloaded_videos", "source", "VARCHAR(50)"),
+    ("subscriptions", "keep_last_n", "INTEGER"),
+    ("subscriptions", "include_members", "BOOLEAN DEFAULT 1"),
+    ("downloaded_videos", "thumbnail", "VARCHAR(500)"),
+    ("subscriptions", "title_filter", "VARCHAR(500)"),
+    ("downloads", "rel_path", "VARCHAR(1000)"),
+    ("downloaded_videos", "rel_path", "VARCHAR(1000)"),
+]
+
+# Indexes added after the initial release. create_all() only creates indexes
+# together with their table, so existing databases need these explicitly.
+_INDEX_MIGRATIONS = [
+    text("CREATE INDEX IF NOT EXISTS ix_downloads_status_created ON downloads (status, created_at)"),
+    text("CREATE INDEX IF NOT EXISTS ix_downloaded_videos_video_id_downloaded_at ON downloaded_videos (video_id, downloaded_at)"),
+    text("CREATE INDEX IF NOT EXISTS ix_subscriptions_enabled_last_checked ON subscriptions (enabled, last_checked)"),
+    text("CREATE INDEX IF NOT EXISTS ix_downloads_rel_path ON downloads (rel_path)"),
+    text("CREATE INDEX IF NOT EXISTS ix_downloaded_videos_rel_path ON downloaded_videos (rel_path)"),
+]
+
+# Data fixes for existing rows. Download statuses used to be stored as enum
+# names ('COMPLETED'); they are now stored as the enum values ('completed').
+# The Default preset flag used to be stored as a fake version (1001) in
+# schema_migrations; it now lives in the meta table.
+_DATA_MIGRATIONS = [
+    text("UPDATE downloads SET status = lower(status) WHERE status != lower(status)"),
+    text("DELETE FROM schema_migrations WHERE version = 1001"),
+]
+
+# Statements run on every startup, built once at import time
+_MIGRATED_TABLES = sorted({table for table, _, _ in _COLUMN_MIGRATIONS})
+_CREATE_MIGRATIONS_TABLE = text(
+    "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY)"
+)
+_SELECT_VERSION = text("SELECT 1 FROM schema_migrations WHERE version = :version")
+_INSERT_VERSION = text("INSERT OR IGNORE INTO schema_migrations (version) VALUES (:version)")
+# Flags for one-off setup steps that are done, kept apart from schema versions
+_CREATE_META_TABLE = text("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY)")
+_SELECT_META = text("SELECT 1 FROM meta WHERE key = :key")
+_INSERT_META = text("INSERT OR IGNORE INTO meta (key) VALUES (:key)")
+_SELECT_COLUMNS = text(
+    "SELECT m.name, p.name FROM sqlite_master m "
+    "JOIN pragma_table_info(m.name) p "
+    "WHERE m.type = 'table' AND m.name IN :tables"
+).bindparams(bindparam("tables", expanding=True))
+
+
+async def _existing_columns(conn) -> dict[str, set[str]]:
+    """Return the column names of every migrated table, keyed by table name."""
+    rows = await conn.execute(_SELECT_COLUMNS, {"tables": _MIGRATED_TABLES})
+    columns: dict[str, set[str]] = {table: set() for table in _MIGRATED_TABLES}
+    for table, column in rows:
+        columns[table].add(column)
+    return columns
+
+
+async def _backfill_rel_paths(conn):
+    """Fill in rel_path for rows recorded before the column existed."""
+    from app.fsutil import relative_download_path
+
+    for table, path_column in (("downloads", "output_path"), ("downloaded_videos", "file_path")):
+        rows = (await conn.execute(text(
+            f"SELECT id, {path_column} FROM {table} "
+            f"WHERE {path_column} IS NOT NULL AND rel_path IS NULL"
+        ))).fetchall()
+        if rows:
+            await conn.execute(
+                text(f"UPDATE {table} SET rel_path = :rel_path WHERE id = :id"),
+                [{"id": row[0], "rel_path": relative_download_path(row[1], DOWNLOADS_DIR_STR)} for row in rows],
+            )
+
+
 async def run_migrations(conn):
     """
     Run database migrations for schema changes.
 
-    Adds new columns to existing tables if they don't exist.
+    Adds new columns and indexes to existing tables if they don't exist and
+    rewrites stored values whose format has changed. The applied
+    schema version is recorded in the schema_migrations table so that
+    up-to-date databases skip the column checks entirely.
+    """
+    await conn.execute(_CREATE_MIGRATIONS_TABLE)
+    result = await conn.execute(_SELECT_VERSION, {"version": SCHEMA_VERSION})
+    if result.first() is not None:
+        return
+
+    columns = await _existing_columns(conn)
+    for table, column, ddl in _COLUMN_MIGRATIONS:
+        if column not in columns[table]:
+            logger.info(f"Adding '{column}' column to {table} table...")
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            columns[table].add(column)
+
+    for statement in _INDEX_MIGRATIONS:
+        await conn.execute(statement)
+
+    await conn.execute(_CREATE_META_TABLE)
+
+    for statement in _DATA_MIGRATIONS:
+        await conn.execute(statement)
+    await _backfill_rel_paths(conn)
+
+    await conn.execute(_INSERT_VERSION, {"version": SCHEMA_VERSION})
+
+
+# Key in the meta table recording that the Default output path preset is in
+# place; removed again when the user deletes the Default preset so it is
+# restored on the next startup.
+DEFAULT_PRESETS_MARKER = "default_presets"
+
+
+async def clear_default_presets_marker(db: AsyncSession) -> None:
     """
-    # Migration: Add source column to downloads table
-    try:
-        await conn.execute(text("SELECT source FROM downloads LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'source' column to downloads table...")
-        await conn.execute(text("ALTER TABLE downloads ADD COLUMN source VARCHAR(50)"))
-
-    # Migration: Add source column to downloaded_videos table
-    try:
-        await conn.execute(text("SELECT source FROM downloaded_videos LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'source' column to downloaded_videos table...")
-        await conn.execute(text("ALTER TABLE downloaded_videos ADD COLUMN source VARCHAR(50)"))
-
-    # Migration: Add keep_last_n column to subscriptions table
-    try:
-        await conn.execute(text("SELECT keep_last_n FROM subscriptions LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'keep_last_n' column to subscriptions table...")
-        await conn.execute(text("ALTER TABLE subscriptions ADD COLUMN keep_last_n INTEGER"))
-
-    # Migration: Add include_members column to subscriptions table
-    try:
-        await conn.execute(text("SELECT include_members FROM subscriptions LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'include_members' column to subscriptions table...")
-        await conn.execute(text("ALTER TABLE subscriptions ADD COLUMN include_members BOOLEAN DEFAULT 1"))
-
-    # Migration: Add thumbnail column to downloaded_videos table
-    try:
-        await conn.execute(text("SELECT thumbnail FROM downloaded_videos LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'thumbnail' column to downloaded_videos table...")
-        await conn.execute(text("ALTER TABLE downloaded_videos ADD COLUMN thumbnail VARCHAR(500)"))
-
-    # Migration: Add title_filter column to subscriptions table
-    try:
-        await conn.execute(text("SELECT title_filter FROM subscriptions LIMIT 1"))
-    except Exception:
-        logger.info("Adding 'title_filter' column to subscriptions table...")
-        await conn.execute(text("ALTER TABLE subscriptions ADD COLUMN title_filter VARCHAR(500)"))
+    Forget that the Default output path preset was ensured.
+
+    Args:
+        db: Session whose transaction the delete joins.
+    """
+    await db.execute(text("DELETE FROM meta WHERE key = :key"), {"key": DEFAULT_PRESETS_MARKER})
 
 
 async def ensure_default_presets():
-    """Ensure default output path preset exists."""
-    from app.models import Settings
+    """
+    Ensure default output path preset exists.
+
+    The settings row is created with INSERT OR IGNORE, so a fresh database
+    needs a single statement. For an existing row, the stored JSON is only
+    parsed when a substring check in SQL cannot find the Default preset.
+    Once the preset is known to exist a marker row is recorded in the meta
+    table, and later startups return after a single lookup.
+    """
+    default_template = "%(channel)s/%(upload_date)s_%(title)s.%(ext)s"
+    default_preset = {"name": "Default", "template": default_template}
 
     async with async_session() as db:
-        result = await db.execute(
-            text("SELECT value FROM settings WHERE key = 'output_path_presets'")
-        )
-        row = result.fetchone()
+        result = await db.execute(_SELECT_META, {"key": DEFAULT_PRESETS_MARKER})
+        if result.first() is not None:
+            return
 
-        default_template = "%(channel)s/%(upload_date)s_%(title)s.%(ext)s"
-        default_preset = {"name": "Default", "template": default_template}
+        await _ensure_default_preset(db, default_preset)
+        await db.execute(_INSERT_META, {"key": DEFAULT_PRESETS_MARKER})
+        await db.commit()
 
-        if row is None:
-            # No presets exist, create with default
-            import json
-            await db.execute(
-                text("INSERT INTO settings (key, value) VALUES (:key, :value)"),
-                {"key": "output_path_presets", "value": json.dumps({"presets": [default_preset]})}
-            )
-            await db.commit()
-            logger.info("Created default output path preset")
-        else:
-            # Check if default preset exists
-            import json
-            data = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-            presets = data.get("presets", [])
-            if not any(p.get("name") == "Default" for p in presets):
-                # Add default preset at the beginning
-                presets.insert(0, default_preset)
-                await db.execute(
-                    text("UPDATE settings SET value = :value WHERE key = 'output_path_presets'"),
-                    {"value": json.dumps({"presets": presets})}
-                )
-                await db.commit()
-                logger.info("Added default output path preset")
+
+async def _ensure_default_preset(db: AsyncSession, default_preset: dict) -> None:
+    """Create the presets row or add the Default preset to it if missing."""
+    result = await db.execute(
+        text("INSERT OR IGNORE INTO settings (key, value) VALUES (:key, :value)"),
+        {"key": "output_path_presets", "value": _json_dumps({"presets": [default_preset]})}
+    )
+    if result.rowcount:
+        logger.info("Created default output path preset")
+        return
+
+    # Only rows that don't mention the Default preset need a closer look.
+    # Older rows were written by the stdlib json module, with spaces.
+    result = await db.execute(
+        text(
+            "SELECT value FROM settings WHERE key = 'output_path_presets' "
+            "AND instr(value, '\"name\":\"Default\"') = 0 "
+            "AND instr(value, '\"name\": \"Default\"') = 0"
+        )
+    )
+    row = result.fetchone()
+    if row is None:
+        return
+
+    data = orjson.loads(row[0]) if isinstance(row[0], str) else row[0]
+    presets = data.get("presets", [])
+    if not any(p.get("name") == "Default" for p in presets):
+        # Add default preset at the beginning
+        presets.insert(0, default_preset)
+        await db.execute(
+            text("UPDATE settings SET value = :value WHERE key = 'output_path_presets'"),
+            {"value": _json_dumps({"presets": presets})}
+        )
+        logger.info("Added default output path preset")
 
 
 async def init_db():
@@ -134,8 +316,16 @@ async def init_db():
     Called on application startup to ensure all model tables exist.
     Uses SQLAlchemy's create_all which is safe to call multiple times
     (only creates tables that don't exist).
+
+    On SQLite the schema work runs in one explicit transaction. The driver
+    does not open a transaction before DDL, so without it each CREATE
+    and ALTER statement would commit (and sync) on its own.
     """
     async with engine.begin() as conn:
+        if _is_sqlite:
+            raw = await conn.get_raw_connection()
+            if not raw.driver_connection.in_transaction:
+                await conn.execute(text("BEGIN IMMEDIATE"))
         await conn.run_sync(Base.metadata.create_all)
         # Run migrations for existing tables
         await run_migrations(conn)
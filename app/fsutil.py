@@ -0,0 +1,105 @@
+"""
+Filesystem helpers.
+
+Small utilities shared by the application modules for working with the
+data and downloads directories.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator
+
+# Directories already ensured during this process
+_ensured: set[str] = set()
+
+
+def ensure_dir(path: Path) -> None:
+    """
+    Ensure a directory exists, creating it (and any parents) if needed.
+
+    Tries a single mkdir first, which is all that is needed when the
+    directory already exists or only the last component is missing, and
+    only falls back to creating the full parent chain when required.
+    Paths are remembered so repeated calls are free.
+
+    Args:
+        path: Directory to create.
+    """
+    key = str(path)
+    if key in _ensured:
+        return
+    try:
+        os.mkdir(key)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        path.mkdir(parents=True, exist_ok=True)
+    _ensured.add(key)
+
+
+def iter_file_entries(root: Path) -> Iterator[os.DirEntry]:
+    """
+    Recursively yield the directory entry of every file below a directory.
+
+    Walks the tree with os.scandir so each entry's type comes from the
+    directory listing and needs no separate stat call. Symlinked
+    directories are not descended into, matching Path.rglob.
+
+    Args:
+        root: Directory to walk.
+
+    Yields:
+        os.DirEntry for each file.
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+
+def iter_files(root: Path) -> Iterator[tuple[str, os.stat_result]]:
+    """
+    Recursively yield every file below a directory.
+
+    Args:
+        root: Directory to walk.
+
+    Yields:
+        Tuples of (path relative to root, stat result) for each file.
+    """
+    base_len = len(str(root)) + 1
+    for entry in iter_file_entries(root):
+        yield entry.path[base_len:], entry.stat()
+
+
+def relative_download_path(path: str, downloads_dir: str) -> str:
+    """
+    Convert a stored download path to a path relative to the downloads dir.
+
+    yt-dlp reports output files as absolute paths, as paths under
+    "./downloads" or "downloads", or already relative, and with either
+    separator depending on the platform.
+
+    Args:
+        path: File path as reported by yt-dlp.
+        downloads_dir: Resolved downloads directory using forward slashes.
+
+    Returns:
+        The path relative to the downloads directory, using forward slashes.
+    """
+    normalized = path.replace("\\", "/")
+    if normalized.startswith(downloads_dir):
+        return normalized[len(downloads_dir):].lstrip("/")
+    if normalized.startswith("./downloads/"):
+        return normalized[12:]  # len("./downloads/") = 12
+    if normalized.startswith("downloads/"):
+        return normalized[10:]  # len("downloads/") = 10
+    return normalized
@@ -10,20 +10,25 @@ This module creates and configures the FastAPI application, including:
 """
 
 import logging
+import queue
 from contextlib import asynccontextmanager
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+import httpx
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 
+from app.config import settings
 from app.database import init_db
-from app.routers import downloads, websocket, subscriptions
+from app.fsutil import ensure_dir
 
 # Configure logging with both console and file output
 LOG_DIR = Path("./data")
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+ensure_dir(LOG_DIR)
 LOG_FILE = LOG_DIR / "app.log"
 
 # Create formatter
@@ -36,7 +41,6 @@ root_logger.setLevel(logging.INFO)
 # Console handler
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(log_formatter)
-root_logger.addHandler(console_handler)
 
 # File handler with rotation (max 5MB, keep 3 backups)
 file_handler = RotatingFileHandler(
@@ -46,7 +50,46 @@ file_handler = RotatingFileHandler(
     encoding="utf-8"
 )
 file_handler.setFormatter(log_formatter)
-root_logger.addHandler(file_handler)
+
+# Route records through a queue so logging calls on the event loop never
+# block on console/file I/O (or a log rotation); a background thread
+# writes them out to the real handlers.
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+log_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+
+
+def start_log_listener() -> None:
+    """
+    Route root logger output through the queue and start the listener thread.
+
+    Does nothing if the listener is already running.
+    """
+    if queue_handler in root_logger.handlers:
+        return
+    log_listener.start()
+    root_logger.addHandler(queue_handler)
+    root_logger.removeHandler(console_handler)
+    root_logger.removeHandler(file_handler)
+
+
+def stop_log_listener() -> None:
+    """
+    Stop the listener thread and log to the real handlers directly again.
+
+    The direct handlers are attached before the queue handler is removed,
+    and stopping the listener writes out everything already queued, so no
+    record is lost. Does nothing if the listener isn't running.
+    """
+    if queue_handler not in root_logger.handlers:
+        return
+    root_logger.addHandler(console_handler)
+    root_logger.addHandler(file_handler)
+    root_logger.removeHandler(queue_handler)
+    log_listener.stop()
+
+
+start_log_listener()
 
 
 @asynccontextmanager
@@ -55,40 +98,78 @@ async def lifespan(app: FastAPI):
     Application lifespan manager.
 
     Handles startup and shutdown tasks:
-    - Startup: Initialize database tables, download semaphore, start subscription checker
-    - Shutdown: Cleanup (handled automatically by context manager)
+    - Startup: Start the log listener thread if it isn't running, initialize
+      database tables, download semaphore, shared HTTP client, start
+      subscription checker
+    - Shutdown: Close the HTTP client, shut down the downloader's thread
+      pools, flush queued log records and stop the log listener thread
     """
+    from app.routers import downloads, subscriptions
+    from app.services.downloader import downloader_service
+
+    start_log_listener()
     await init_db()
     await downloads.init_download_semaphore()
+    # Shared client for upstream requests (e.g. PyPI), keeping connections alive
+    app.state.http = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=32),
+    )
     subscriptions.start_subscription_checker()
     yield
+    await app.state.http.aclose()
+    downloader_service.close()
+    stop_log_listener()
 
 
 # Application version
 APP_VERSION = "1.7.0"
 
-# Create FastAPI application instance
+# Create FastAPI application instance. JSON responses are encoded with
+# orjson rather than the stdlib json module.
 app = FastAPI(
     title="Corvid Cache",
     description="Self-hosted web interface for yt-dlp",
     version=APP_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Mount static files directory for CSS, JS, and images
 static_path = Path(__file__).parent / "static"
-static_path.mkdir(parents=True, exist_ok=True)
+ensure_dir(static_path)
 app.mount("/static", StaticFiles(directory=static_path), name="static")
 
 # Configure Jinja2 templates
 templates_path = Path(__file__).parent.parent / "templates"
-templates_path.mkdir(parents=True, exist_ok=True)
+ensure_dir(templates_path)
 templates = Jinja2Templates(directory=templates_path)
 
+# Persist compiled templates so restarts skip parsing index.html again.
+# Inside Docker the templates are baked into the image, so skip the
+# per-render modification check as well.
+JINJA_CACHE_DIR = LOG_DIR / "jinja_cache"
+ensure_dir(JINJA_CACHE_DIR)
+templates.env.bytecode_cache = FileSystemBytecodeCache(directory=str(JINJA_CACHE_DIR), pattern="%s.cache")
+templates.env.auto_reload = not settings.running_in_docker
+
+
+def _register_routers(app: FastAPI) -> None:
+    """
+    Import the API routers and attach them to the application.
+
+    The router modules pull in yt-dlp and the downloader service, so
+    they are imported here rather than at the top of this module.
+    """
+    from app.routers import downloads, websocket, subscriptions
+
+    app.include_router(downloads.router)
+    app.include_router(websocket.router)
+    app.include_router(subscriptions.router)
+
+
 # Register API routers
-app.include_router(downloads.router)
-app.include_router(websocket.router)
-app.include_router(subscriptions.router)
+_register_routers(app)
 
 
 @app.get("/")
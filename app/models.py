@@ -9,7 +9,8 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from typing import Optional
 
-from sqlalchemy import String, Float, DateTime, JSON, Enum, Boolean, Integer, func
+from sqlalchemy import String, Text, Float, DateTime, JSON, Boolean, Integer, Index
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -37,6 +38,21 @@ class DownloadStatus(str, PyEnum):
     CANCELLED = "cancelled"
 
 
+class DownloadStatusType(TypeDecorator):
+    """
+    Stores DownloadStatus as its plain string value.
+
+    DownloadStatus already subclasses str, so values are written as-is and
+    only rebuilt into enum members when rows are loaded. This avoids the
+    name/value lookups SQLAlchemy's Enum type performs in both directions.
+    """
+    impl = String(20)
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return DownloadStatus(value) if value else None
+
+
 class Download(Base):
     """
     Represents a video download task.
@@ -55,13 +71,18 @@ class Download(Base):
         progress: Download progress percentage (0-100).
         speed: Current download speed (e.g., "1.5 MiB/s").
         eta: Estimated time remaining (e.g., "00:05:23").
-        output_path: Relative path to downloaded file.
+        output_path: Path to downloaded file as reported by yt-dlp.
+        rel_path: Output path relative to the downloads directory, used to
+            match files on disk.
         error_message: Error description if download failed.
         options: JSON blob of download options used.
         created_at: Timestamp when download was queued.
         completed_at: Timestamp when download finished.
     """
     __tablename__ = "downloads"
+    __table_args__ = (
+        Index("ix_downloads_status_created", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     video_id: Mapped[Optional[str]] = mapped_column(String(50), nullable=True, index=True)
@@ -70,15 +91,16 @@ class Download(Base):
     thumbnail: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     source: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     status: Mapped[DownloadStatus] = mapped_column(
-        Enum(DownloadStatus), default=DownloadStatus.QUEUED
+        DownloadStatusType(), default=DownloadStatus.QUEUED.value
     )
     progress: Mapped[float] = mapped_column(Float, default=0.0)
     speed: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     eta: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     output_path: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
-    error_message: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    rel_path: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True, index=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     options: Mapped[dict] = mapped_column(JSON, default=dict)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
 
@@ -98,8 +120,12 @@ class DownloadedVideo(Base):
         thumbnail: URL to video thumbnail image.
         downloaded_at: Timestamp of successful download.
         file_path: Path to file (may be outdated if file moved/deleted).
+        rel_path: File path relative to the downloads directory.
     """
     __tablename__ = "downloaded_videos"
+    __table_args__ = (
+        Index("ix_downloaded_videos_video_id_downloaded_at", "video_id", "downloaded_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     video_id: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -107,8 +133,9 @@ class DownloadedVideo(Base):
     channel: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
     source: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     thumbnail: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
-    downloaded_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    downloaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     file_path: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    rel_path: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True, index=True)
 
 
 class Subscription(Base):
@@ -132,6 +159,9 @@ class Subscription(Base):
         include_members: Whether to include members-only videos.
     """
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index("ix_subscriptions_enabled_last_checked", "enabled", "last_checked"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     url: Mapped[str] = mapped_column(String(500))
@@ -141,7 +171,7 @@ class Subscription(Base):
     options: Mapped[dict] = mapped_column(JSON, default=dict)
     last_checked: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     last_video_count: Mapped[int] = mapped_column(Integer, default=0)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     keep_last_n: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=None)
     include_members: Mapped[bool] = mapped_column(Boolean, default=True)
     title_filter: Mapped[Optional[str]] = mapped_column(String(500), nullable=True, default=None)
@@ -19,20 +19,29 @@ import sys
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from stat import S_ISREG
+from typing import AbstractSet, Optional
 
-import httpx
 import yt_dlp
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, UploadFile, File
 
 logger = logging.getLogger(__name__)
-from fastapi.responses import FileResponse
-from sqlalchemy import select, func
+from fastapi.responses import FileResponse, ORJSONResponse
+from sqlalchemy import delete, insert, literal, null, select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.config import settings
-from app.database import get_db
+from sqlalchemy.orm import load_only
+
+from app.config import (
+    settings,
+    DOWNLOADS_DIR,
+    DOWNLOADS_DIR_RESOLVED,
+    DOWNLOADS_DIR_STR,
+    MAX_CONCURRENT_DOWNLOADS,
+)
+from app.database import get_db, get_db_readonly, clear_default_presets_marker
+from app.fsutil import ensure_dir, iter_files, relative_download_path
 from app.models import Download, DownloadedVideo, DownloadStatus, Settings
 from app.schemas import (
     DownloadCreate,
@@ -49,6 +58,36 @@ from app.routers.websocket import manager
 
 router = APIRouter(prefix="/api", tags=["downloads"])
 
+# How long the latest yt-dlp version from PyPI is reused, in seconds
+PYPI_VERSION_TTL = 600
+_pypi_cache: tuple[Optional[str], float] = (None, 0.0)
+
+# Cookie uploads are streamed to disk in chunks of this size
+COOKIE_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Any of these marks an upload as a Netscape/Mozilla format cookie file
+COOKIE_FILE_MARKERS = (b"# Netscape HTTP Cookie File", b"# HTTP Cookie File", b".youtube.com")
+COOKIE_MARKER_OVERLAP = max(len(marker) for marker in COOKIE_FILE_MARKERS)
+
+# Maximum number of paths per IN (...) lookup in list_files
+FILE_LOOKUP_CHUNK_SIZE = 500
+
+# Statuses of downloads that can still be cancelled, and of those that can
+# be retried
+ACTIVE_STATUSES = (
+    DownloadStatus.QUEUED.value,
+    DownloadStatus.FETCHING_INFO.value,
+    DownloadStatus.DOWNLOADING.value,
+    DownloadStatus.PROCESSING.value,
+)
+RETRYABLE_STATUSES = (DownloadStatus.FAILED.value, DownloadStatus.CANCELLED.value)
+
+# In-memory copy of the video IDs in the download history, loaded on first
+# use. Completed downloads add to it and history deletes drop it; the
+# generation counter keeps a load that overlaps either from being stored.
+_downloaded_ids: Optional[set[str]] = None
+_downloaded_ids_generation = 0
+
 # Track active download tasks
 active_tasks: dict[int, asyncio.Task] = {}
 
@@ -65,7 +104,7 @@ async def init_download_semaphore():
 
     from app.database import async_session
 
-    max_concurrent = settings.max_concurrent_downloads
+    max_concurrent = MAX_CONCURRENT_DOWNLOADS
 
     try:
         async with async_session() as db:
@@ -74,7 +113,7 @@ async def init_download_semaphore():
             )
             setting = result.scalar_one_or_none()
             if setting:
-                max_concurrent = setting.value.get("value", settings.max_concurrent_downloads)
+                max_concurrent = setting.value.get("value", MAX_CONCURRENT_DOWNLOADS)
     except Exception as e:
         logger.warning(f"Failed to load max concurrent setting: {e}")
 
@@ -87,7 +126,7 @@ def get_download_semaphore() -> asyncio.Semaphore:
     """Get the download semaphore (creates default if not initialized)."""
     global download_semaphore
     if download_semaphore is None:
-        download_semaphore = asyncio.Semaphore(settings.max_concurrent_downloads)
+        download_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
     return download_semaphore
 
 
@@ -127,9 +166,10 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
         # Update status to fetching info
         download.status = DownloadStatus.FETCHING_INFO
         await db.commit()
-        await manager.broadcast(
-            {"type": "status", "id": download_id, "status": "fetching_info"}
-        )
+        if manager.has_clients():
+            await manager.broadcast(
+                {"type": "status", "id": download_id, "status": "fetching_info"}
+            )
 
         try:
             # Extract info first to get video_id and title (with timeout)
@@ -149,56 +189,26 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
             await db.commit()
             logger.info(f"[Download {download_id}] Video info extracted: {download.title}")
 
-            await manager.broadcast(
-                {
-                    "type": "info",
-                    "id": download_id,
-                    "video_id": download.video_id,
-                    "title": download.title,
-                    "thumbnail": download.thumbnail,
-                    "source": download.source,
-                    "status": "downloading",
-                }
-            )
+            if manager.has_clients():
+                await manager.broadcast(
+                    {
+                        "type": "info",
+                        "id": download_id,
+                        "video_id": download.video_id,
+                        "title": download.title,
+                        "thumbnail": download.thumbnail,
+                        "source": download.source,
+                        "status": "downloading",
+                    }
+                )
 
             # Get event loop reference for thread-safe callback
             loop = asyncio.get_running_loop()
             last_broadcast = {"progress": -1, "time": 0}
 
-            # Progress callback - just broadcast, skip DB updates for performance
-            async def progress_callback(data: dict):
-                try:
-                    progress = data.get("progress", 0)
-                    status = data.get("status", "downloading")
-
-                    if status == "processing":
-                        # Post-processing phase
-                        processing_step = data.get("processing_step", "Processing...")
-                        logger.debug(f"[Download {download_id}] Processing: {processing_step}")
-                        await manager.broadcast(
-                            {
-                                "type": "processing",
-                                "id": download_id,
-                                "progress": 100,
-                                "status": "processing",
-                                "processing_step": processing_step,
-                            }
-                        )
-                    else:
-                        logger.debug(f"[Download {download_id}] Broadcasting progress: {progress:.1f}%")
-                        await manager.broadcast(
-                            {
-                                "type": "progress",
-                                "id": download_id,
-                                "progress": progress,
-                                "speed": data.get("speed"),
-                                "eta": data.get("eta"),
-                            }
-                        )
-                except Exception as e:
-                    logger.error(f"[Download {download_id}] Broadcast error: {e}")
-
-            # Sync wrapper for progress callback (called from executor thread)
+            # Progress callback (called from executor thread) - just broadcast,
+            # skip DB updates for performance. Messages are handed to the
+            # broadcast queue on the loop thread without creating a coroutine.
             def sync_progress_callback(data: dict):
                 current_time = time.time()
                 progress = data.get("progress", 0)
@@ -206,8 +216,19 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
 
                 # Always broadcast processing status changes immediately
                 if status == "processing":
-                    logger.info(f"[Download {download_id}] Processing: {data.get('processing_step', 'Processing...')}")
-                    asyncio.run_coroutine_threadsafe(progress_callback(data), loop)
+                    processing_step = data.get("processing_step", "Processing...")
+                    logger.info(f"[Download {download_id}] Processing: {processing_step}")
+                    if manager.has_clients():
+                        loop.call_soon_threadsafe(
+                            manager.publish,
+                            {
+                                "type": "processing",
+                                "id": download_id,
+                                "progress": 100,
+                                "status": "processing",
+                                "processing_step": processing_step,
+                            },
+                        )
                     return
 
                 # Throttle: update at most every 0.5 seconds OR if progress jumped significantly
@@ -220,7 +241,18 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
                     last_broadcast["progress"] = progress
                     last_broadcast["time"] = current_time
                     logger.info(f"[Download {download_id}] Progress: {progress:.1f}% | Speed: {data.get('speed')} | ETA: {data.get('eta')}")
-                    asyncio.run_coroutine_threadsafe(progress_callback(data), loop)
+                    # Skip building the message when no client is connected
+                    if manager.has_clients():
+                        loop.call_soon_threadsafe(
+                            manager.publish,
+                            {
+                                "type": "progress",
+                                "id": download_id,
+                                "progress": progress,
+                                "speed": data.get("speed"),
+                                "eta": data.get("eta"),
+                            },
+                        )
 
             # Download
             logger.info(f"[Download {download_id}] Starting download with options: {options}")
@@ -234,69 +266,72 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
                 download.status = DownloadStatus.COMPLETED
                 download.progress = 100
                 download.output_path = result.get("filename")
+                if download.output_path:
+                    download.rel_path = relative_download_path(download.output_path, DOWNLOADS_DIR_STR)
                 download.completed_at = datetime.utcnow()
                 await db.commit()
 
                 # Add to downloaded videos history
                 video_id = result.get("video_id") or download.video_id
                 if video_id:
-                    existing = await db.execute(
-                        select(DownloadedVideo).where(
-                            DownloadedVideo.video_id == video_id
-                        )
-                    )
-                    if not existing.scalar_one_or_none():
-                        downloaded_video = DownloadedVideo(
+                    # Record in history unless this video is already there
+                    await db.execute(
+                        sqlite_insert(DownloadedVideo)
+                        .values(
                             video_id=video_id,
                             title=result.get("title") or download.title,
                             channel=result.get("channel"),
                             source=download.source,
                             thumbnail=download.thumbnail,
                             file_path=result.get("filename"),
+                            rel_path=download.rel_path,
                         )
-                        db.add(downloaded_video)
-                        await db.commit()
+                        .on_conflict_do_nothing(index_elements=["video_id"])
+                    )
 
                     # Clean up old failed/cancelled download records for same video
                     old_downloads = await db.execute(
-                        select(Download).where(
+                        delete(Download).where(
                             Download.video_id == video_id,
                             Download.id != download_id,
                             Download.status.in_([DownloadStatus.FAILED, DownloadStatus.CANCELLED])
-                        )
+                        ).returning(Download.id, Download.status)
                     )
-                    for old_dl in old_downloads.scalars().all():
-                        logger.info(f"[Download {download_id}] Cleaning up old {old_dl.status.value} record {old_dl.id} for video {video_id}")
-                        await db.delete(old_dl)
+                    for old_id, old_status in old_downloads.all():
+                        logger.info(f"[Download {download_id}] Cleaned up old {old_status.value} record {old_id} for video {video_id}")
                     await db.commit()
-
-                await manager.broadcast(
-                    {
-                        "type": "completed",
-                        "id": download_id,
-                        "status": "completed",
-                        "output_path": download.output_path,
-                    }
-                )
+                    _record_downloaded_video_id(video_id)
+
+                if manager.has_clients():
+                    await manager.broadcast(
+                        {
+                            "type": "completed",
+                            "id": download_id,
+                            "status": "completed",
+                            "output_path": download.output_path,
+                        }
+                    )
             elif result.get("cancelled"):
                 download.status = DownloadStatus.CANCELLED
                 await db.commit()
-                await manager.broadcast(
-                    {"type": "cancelled", "id": download_id, "status": "cancelled"}
-                )
+                if manager.has_clients():
+                    await manager.broadcast(
+                        {"type": "cancelled", "id": download_id, "status": "cancelled"}
+                    )
             else:
                 download.status = DownloadStatus.FAILED
                 download.error_message = result.get("error", "Unknown error")
                 logger.error(f"[Download {download_id}] Download failed: {download.error_message}")
                 await db.commit()
-                await manager.broadcast(
-                    {
-                        "type": "error",
-                        "id": download_id,
-                        "status": "failed",
-                        "error": download.error_message,
-                    }
-                )
+                if manager.has_clients():
+                    await manager.broadcast(
+                        {
+                            "type": "error",
+                            "id": download_id,
+                            "status": "failed",
+                            "error": download.error_message,
+                        }
+                    )
 
         except Exception as e:
             import traceback
@@ -305,17 +340,83 @@ async def _process_download_inner(download_id: int, url: str, options: dict):
             download.status = DownloadStatus.FAILED
             download.error_message = str(e)
             await db.commit()
-            await manager.broadcast(
-                {
-                    "type": "error",
-                    "id": download_id,
-                    "status": "failed",
-                    "error": str(e),
-                }
-            )
-        finally:
-            if download_id in active_tasks:
-                del active_tasks[download_id]
+            if manager.has_clients():
+                await manager.broadcast(
+                    {
+                        "type": "error",
+                        "id": download_id,
+                        "status": "failed",
+                        "error": str(e),
+                    }
+                )
+
+
+async def get_downloaded_video_ids(db: AsyncSession) -> AbstractSet[str]:
+    """
+    Get the video IDs in the download history.
+
+    The IDs are read from the database once and then kept in memory, so
+    playlist and subscription checks don't load the whole history table
+    on every call. The returned set is shared and must not be modified.
+
+    Args:
+        db: Session used when the IDs need to be loaded.
+
+    Returns:
+        Set of downloaded video IDs.
+    """
+    global _downloaded_ids
+    if _downloaded_ids is not None:
+        return _downloaded_ids
+
+    generation = _downloaded_ids_generation
+    ids = set(await db.scalars(select(DownloadedVideo.video_id)))
+    if generation == _downloaded_ids_generation:
+        _downloaded_ids = ids
+    return ids
+
+
+def _record_downloaded_video_id(video_id: str):
+    """Add a newly recorded history entry to the in-memory ID set."""
+    global _downloaded_ids_generation
+    _downloaded_ids_generation += 1
+    if _downloaded_ids is not None:
+        _downloaded_ids.add(video_id)
+
+
+def invalidate_downloaded_video_ids():
+    """Drop the in-memory ID set after history entries are deleted."""
+    global _downloaded_ids, _downloaded_ids_generation
+    _downloaded_ids_generation += 1
+    _downloaded_ids = None
+
+
+def start_download_task(download_id: int, url: str, options: dict) -> asyncio.Task:
+    """
+    Start processing a download in a background task.
+
+    The task is kept in active_tasks until it finishes, so it stays
+    referenced while running and can be cancelled by download ID. Its done
+    callback removes the entry however the task ends.
+
+    Args:
+        download_id: ID of the download record to process.
+        url: URL to download.
+        options: Download options as a dict.
+
+    Returns:
+        The created task.
+    """
+    task = asyncio.create_task(process_download(download_id, url, options))
+    active_tasks[download_id] = task
+
+    def _forget(done: asyncio.Task):
+        # A retry may already have registered a newer task for this ID
+        if active_tasks.get(download_id) is done:
+            del active_tasks[download_id]
+
+    task.add_done_callback(_forget)
+    return task
 
 
 @router.post("/downloads", response_model=DownloadResponse)
@@ -335,10 +436,7 @@ async def create_download(
     await db.refresh(download)
 
     # Start background download task
-    task = asyncio.create_task(
-        process_download(download.id, data.url, data.options.model_dump())
-    )
-    active_tasks[download.id] = task
+    start_download_task(download.id, data.url, data.options.model_dump())
 
     return download
 
@@ -350,24 +448,28 @@ async def create_batch_download(
     db: AsyncSession = Depends(get_db),
 ):
     """Create multiple downloads from a list of URLs."""
-    downloads = []
-    for url in data.urls:
-        download = Download(
-            url=url,
-            options=data.options.model_dump(),
-            status=DownloadStatus.QUEUED,
-        )
-        db.add(download)
-        downloads.append(download)
-
+    if not data.urls:
+        return []
+
+    # The options are shared by every URL, so dump them once
+    options = data.options.model_dump()
+
+    # One multi-row INSERT ... RETURNING that hands back the new rows as
+    # loaded objects, so no per-row refresh is needed after the commit.
+    # SQLite doesn't guarantee the order of RETURNING rows, so SQLAlchemy is
+    # asked to put them back in the order of the URLs.
+    result = await db.scalars(
+        insert(Download).returning(Download, sort_by_parameter_order=True),
+        [
+            {"url": url, "options": options, "status": DownloadStatus.QUEUED.value}
+            for url in data.urls
+        ],
+    )
+    downloads = result.all()
     await db.commit()
 
     for download in downloads:
-        await db.refresh(download)
-        task = asyncio.create_task(
-            process_download(download.id, download.url, data.options.model_dump())
-        )
-        active_tasks[download.id] = task
+        start_download_task(download.id, download.url, options)
 
     return downloads
 
@@ -377,7 +479,7 @@ async def list_downloads(
     status: Optional[str] = None,
     page: int = 1,
     limit: int = 25,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db_readonly),
 ):
     """List all downloads with pagination. Status can be a single value or comma-separated list."""
     # Build base query
@@ -390,19 +492,23 @@ async def list_downloads(
         else:
             base_query = base_query.where(Download.status.in_(status_list))
 
-    # Get total count
-    count_query = select(func.count()).select_from(base_query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    # Get paginated results
+    # Get paginated results together with the total count (window function)
     # Sort by completed_at (for finished downloads) or created_at (for in-progress)
     offset = (page - 1) * limit
-    query = base_query.order_by(
+    query = base_query.add_columns(func.count().over()).order_by(
         func.coalesce(Download.completed_at, Download.created_at).desc()
     ).offset(offset).limit(limit)
-    result = await db.execute(query)
-    downloads = result.scalars().all()
+    rows = (await db.execute(query)).all()
+    downloads = [row[0] for row in rows]
+
+    if rows:
+        total = rows[0][1]
+    elif offset > 0:
+        # Page past the end: no rows to carry the count, so count separately
+        count_query = select(func.count()).select_from(base_query.subquery())
+        total = (await db.execute(count_query)).scalar()
+    else:
+        total = 0
 
     return {
         "downloads": [DownloadResponse.model_validate(d) for d in downloads],
@@ -414,7 +520,7 @@ async def list_downloads(
 
 
 @router.get("/downloads/{download_id}", response_model=DownloadResponse)
-async def get_download(download_id: int, db: AsyncSession = Depends(get_db)):
+async def get_download(download_id: int, db: AsyncSession = Depends(get_db_readonly)):
     """Get a specific download."""
     result = await db.execute(select(Download).where(Download.id == download_id))
     download = result.scalar_one_or_none()
@@ -426,19 +532,17 @@ async def get_download(download_id: int, db: AsyncSession = Depends(get_db)):
 @router.delete("/downloads/{download_id}")
 async def cancel_download(download_id: int, db: AsyncSession = Depends(get_db)):
     """Cancel or delete a download."""
-    result = await db.execute(select(Download).where(Download.id == download_id))
-    download = result.scalar_one_or_none()
-    if not download:
-        raise HTTPException(status_code=404, detail="Download not found")
-
-    if download.status in [DownloadStatus.QUEUED, DownloadStatus.DOWNLOADING, DownloadStatus.FETCHING_INFO, DownloadStatus.PROCESSING]:
-        # Cancel active download
-        logger.info(f"[Download {download_id}] Cancelling download...")
-        downloader_service.cancel_download(download_id)
-
-        # Update status immediately
-        download.status = DownloadStatus.CANCELLED
+    # Cancel an active download with a single conditional UPDATE
+    result = await db.execute(
+        update(Download)
+        .where(Download.id == download_id, Download.status.in_(ACTIVE_STATUSES))
+        .values(status=DownloadStatus.CANCELLED.value)
+        .returning(Download.id)
+    )
+    if result.first() is not None:
         await db.commit()
+        logger.info(f"[Download {download_id}] Cancelling download...")
+        await downloader_service.cancel_download(download_id)
 
         # Broadcast cancellation to UI
         await manager.broadcast(
@@ -451,15 +555,19 @@ async def cancel_download(download_id: int, db: AsyncSession = Depends(get_db)):
                 active_tasks[download_id].cancel()
             except Exception as e:
                 logger.warning(f"[Download {download_id}] Error cancelling task: {e}")
-            finally:
-                del active_tasks[download_id]
 
         return {"status": "cancelled"}
-    else:
-        # Delete completed/failed download record
-        await db.delete(download)
-        await db.commit()
-        return {"status": "deleted"}
+
+    # Otherwise delete the completed/failed download record
+    result = await db.execute(
+        delete(Download)
+        .where(Download.id == download_id, Download.status.not_in(ACTIVE_STATUSES))
+        .returning(Download.id)
+    )
+    if result.first() is None:
+        raise HTTPException(status_code=404, detail="Download not found")
+    await db.commit()
+    return {"status": "deleted"}
 
 
 @router.delete("/downloads")
@@ -479,13 +587,12 @@ async def clear_downloads(
             raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
 
         result = await db.execute(
-            select(Download).where(Download.status == status_map[status])
+            delete(Download).where(Download.status == status_map[status])
         )
-        downloads = result.scalars().all()
     else:
         # Clear all non-active downloads
         result = await db.execute(
-            select(Download).where(
+            delete(Download).where(
                 Download.status.in_([
                     DownloadStatus.COMPLETED,
                     DownloadStatus.CANCELLED,
@@ -493,22 +600,17 @@ async def clear_downloads(
                 ])
             )
         )
-        downloads = result.scalars().all()
-
-    count = len(downloads)
-    for download in downloads:
-        await db.delete(download)
 
     await db.commit()
 
-    return {"deleted": count}
+    return {"deleted": result.rowcount}
 
 
 @router.post("/downloads/cancel-all")
 async def cancel_all_active(db: AsyncSession = Depends(get_db)):
     """Cancel all active downloads (queued, fetching_info, downloading, processing)."""
     result = await db.execute(
-        select(Download).where(
+        select(Download).options(load_only(Download.id, Download.status)).where(
             Download.status.in_([
                 DownloadStatus.QUEUED,
                 DownloadStatus.FETCHING_INFO,
@@ -532,7 +634,7 @@ async def cancel_all_active(db: AsyncSession = Depends(get_db)):
             await db.commit()
 
             # Set cancel flag in downloader service
-            downloader_service.cancel_download(download_id)
+            await downloader_service.cancel_download(download_id)
 
             # Broadcast cancellation
             await manager.broadcast(
@@ -546,9 +648,6 @@ async def cancel_all_active(db: AsyncSession = Depends(get_db)):
                     logger.info(f"[Cancel All] Cancelled task for download {download_id}")
                 except Exception as e:
                     logger.warning(f"[Cancel All] Error cancelling task {download_id}: {e}")
-                finally:
-                    if download_id in active_tasks:
-                        del active_tasks[download_id]
 
             cancelled_count += 1
 
@@ -564,29 +663,30 @@ async def cancel_all_active(db: AsyncSession = Depends(get_db)):
 @router.post("/downloads/{download_id}/retry", response_model=DownloadResponse)
 async def retry_download(download_id: int, db: AsyncSession = Depends(get_db)):
     """Retry a failed or cancelled download."""
-    result = await db.execute(select(Download).where(Download.id == download_id))
-    download = result.scalar_one_or_none()
-    if not download:
-        raise HTTPException(status_code=404, detail="Download not found")
-
-    if download.status not in [DownloadStatus.FAILED, DownloadStatus.CANCELLED]:
+    # Reset download state in one UPDATE ... RETURNING, guarded on status
+    download = await db.scalar(
+        update(Download)
+        .where(Download.id == download_id, Download.status.in_(RETRYABLE_STATUSES))
+        .values(
+            status=DownloadStatus.QUEUED.value,
+            progress=0,
+            speed=None,
+            eta=None,
+            error_message=None,
+            completed_at=None,
+        )
+        .returning(Download)
+    )
+    if download is None:
+        # Nothing was updated; only now find out why
+        exists = await db.scalar(select(Download.id).where(Download.id == download_id))
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Download not found")
         raise HTTPException(status_code=400, detail="Can only retry failed or cancelled downloads")
-
-    # Reset download state
-    download.status = DownloadStatus.QUEUED
-    download.progress = 0
-    download.speed = None
-    download.eta = None
-    download.error_message = None
-    download.completed_at = None
     await db.commit()
-    await db.refresh(download)
 
     # Start background download task
-    task = asyncio.create_task(
-        process_download(download.id, download.url, download.options)
-    )
-    active_tasks[download.id] = task
+    start_download_task(download.id, download.url, download.options)
 
     return download
 
@@ -623,137 +723,93 @@ async def extract_info(data: ExtractRequest):
 
 
 @router.post("/playlist", response_model=PlaylistResponse)
-async def get_playlist(data: PlaylistRequest, db: AsyncSession = Depends(get_db)):
-    """Get all entries from a playlist or channel."""
+async def get_playlist(data: PlaylistRequest, db: AsyncSession = Depends(get_db_readonly)):
+    """
+    Get all entries from a playlist or channel.
+
+    The downloader's playlist items have the fields of PlaylistEntry and are
+    serialized by orjson as they are, skipping response model validation of
+    what can be thousands of entries; the response_model still documents
+    the shape.
+    """
     try:
         # Get already downloaded video IDs
-        result = await db.execute(select(DownloadedVideo.video_id))
-        downloaded_ids = set(row[0] for row in result.fetchall())
+        downloaded_ids = await get_downloaded_video_ids(db)
 
         title, entries = await downloader_service.get_playlist_entries(
             data.url, downloaded_ids
         )
 
-        return PlaylistResponse(
-            title=title,
-            entries=entries,
-            total_count=len(entries),
-        )
+        return ORJSONResponse({
+            "title": title,
+            "entries": entries,
+            "total_count": len(entries),
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/files", response_model=list[FileInfo])
-async def list_files(db: AsyncSession = Depends(get_db)):
+async def list_files(db: AsyncSession = Depends(get_db_readonly)):
     """List all downloaded files including those in subfolders."""
-    # Get all downloads with thumbnails for lookup
-    result = await db.execute(
-        select(Download.output_path, Download.thumbnail, Download.source).where(
-            Download.output_path.isnot(None)
-        )
-    )
-    # Normalize paths for lookup (handle both / and \ separators, full and relative paths)
-    file_info_map = {}  # Maps path -> {thumbnail, source}
-    downloads_dir_str = str(settings.downloads_dir.resolve()).replace("\\", "/")
-    for row in result.fetchall():
-        path = row[0]
-        info = {"thumbnail": row[1], "source": row[2]}
-        # Normalize to forward slashes
-        normalized = path.replace("\\", "/")
-
-        # Store with original path
-        file_info_map[normalized] = info
-        file_info_map[path] = info
-
-        # Also try to extract relative path if it's a full path
-        if normalized.startswith(downloads_dir_str):
-            rel_path = normalized[len(downloads_dir_str):].lstrip("/")
-            file_info_map[rel_path] = info
-
-        # Also try with ./downloads prefix stripped
-        if normalized.startswith("./downloads/"):
-            rel_path = normalized[12:]  # len("./downloads/") = 12
-            file_info_map[rel_path] = info
-        elif normalized.startswith("downloads/"):
-            rel_path = normalized[10:]  # len("downloads/") = 10
-            file_info_map[rel_path] = info
-
-    # Also get info from DownloadedVideo history (fallback for cleared downloads)
-    history_result = await db.execute(
-        select(DownloadedVideo.file_path, DownloadedVideo.thumbnail, DownloadedVideo.source).where(
-            DownloadedVideo.file_path.isnot(None)
-        )
-    )
-    for row in history_result.fetchall():
-        path = row[0]
-        if not path:
-            continue
-        info = {"thumbnail": row[1], "source": row[2]}
-        normalized = path.replace("\\", "/")
-
-        # Only add if not already in map (downloads table takes priority)
-        if normalized not in file_info_map:
-            file_info_map[normalized] = info
-            file_info_map[path] = info
-
-            if normalized.startswith(downloads_dir_str):
-                rel_path = normalized[len(downloads_dir_str):].lstrip("/")
-                if rel_path not in file_info_map:
-                    file_info_map[rel_path] = info
-
-            if normalized.startswith("./downloads/"):
-                rel_path = normalized[12:]
-                if rel_path not in file_info_map:
-                    file_info_map[rel_path] = info
-            elif normalized.startswith("downloads/"):
-                rel_path = normalized[10:]
-                if rel_path not in file_info_map:
-                    file_info_map[rel_path] = info
+    # Walk the tree in a worker thread so the stat calls don't block the loop
+    loop = asyncio.get_running_loop()
+    entries = await loop.run_in_executor(None, lambda: list(iter_files(DOWNLOADS_DIR)))
+    rel_paths = [path.replace("\\", "/") for path, _ in entries]
+
+    # Look up thumbnail/source for the files on disk by their relative path.
+    # Downloads take priority, history is the fallback for cleared downloads.
+    file_info_map = {}  # Maps rel_path -> {thumbnail, source}
+    for model in (Download, DownloadedVideo):
+        missing = [path for path in rel_paths if path not in file_info_map]
+        for i in range(0, len(missing), FILE_LOOKUP_CHUNK_SIZE):
+            result = await db.execute(
+                select(model.rel_path, model.thumbnail, model.source).where(
+                    model.rel_path.in_(missing[i:i + FILE_LOOKUP_CHUNK_SIZE])
+                )
+            )
+            for rel_path, thumbnail, source in result:
+                file_info_map.setdefault(rel_path, {"thumbnail": thumbnail, "source": source})
 
     files = []
-    downloads_path = settings.downloads_dir
-    if downloads_path.exists():
-        # Recursively find all files
-        for file_path in downloads_path.rglob("*"):
-            if file_path.is_file():
-                # Get relative path from downloads directory
-                relative_path = file_path.relative_to(downloads_path)
-                stat = file_path.stat()
-                relative_path_str = str(relative_path)
-                # Normalize for lookup
-                normalized_path = relative_path_str.replace("\\", "/")
-
-                # Look up file info by matching output_path
-                info = file_info_map.get(normalized_path) or file_info_map.get(relative_path_str) or {}
-
-                files.append(
-                    FileInfo(
-                        name=relative_path_str,
-                        size=stat.st_size,
-                        modified=datetime.fromtimestamp(stat.st_mtime),
-                        thumbnail=info.get("thumbnail"),
-                        source=info.get("source"),
-                    )
-                )
+    for (relative_path_str, stat), rel_path in zip(entries, rel_paths):
+        info = file_info_map.get(rel_path) or {}
+
+        files.append(
+            FileInfo(
+                name=relative_path_str,
+                size=stat.st_size,
+                modified=datetime.fromtimestamp(stat.st_mtime),
+                thumbnail=info.get("thumbnail"),
+                source=info.get("source"),
+            )
+        )
     return sorted(files, key=lambda f: f.modified, reverse=True)
 
 
 @router.get("/files/{file_path:path}")
 async def get_file(file_path: str):
     """Serve a downloaded file."""
-    full_path = settings.downloads_dir / file_path
-    if not full_path.exists() or not full_path.is_file():
+    full_path = DOWNLOADS_DIR / file_path
+    # Stat once (off the event loop); the result is reused by FileResponse
+    # for its headers
+    loop = asyncio.get_running_loop()
+    try:
+        stat_result = await loop.run_in_executor(None, os.stat, full_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found")
 
     # Ensure file is within downloads directory (security check)
     try:
-        full_path.resolve().relative_to(settings.downloads_dir.resolve())
+        full_path.resolve().relative_to(DOWNLOADS_DIR_RESOLVED)
     except ValueError:
         raise HTTPException(status_code=403, detail="Access denied")
 
     # Use just the filename for the download name
     filename = Path(file_path).name
-    return FileResponse(full_path, filename=filename)
+    return FileResponse(full_path, filename=filename, stat_result=stat_result)
 
 
 # Cookie Management Endpoints
@@ -761,15 +817,16 @@ async def get_file(file_path: str):
 @router.get("/cookies")
 async def get_cookie_status():
     """Get current cookie status."""
-    has_cookies = downloader_service.has_cookies()
-    if has_cookies:
-        stat = settings.cookies_path.stat()
-        return {
-            "has_cookies": True,
-            "file_size": stat.st_size,
-            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        }
-    return {"has_cookies": False}
+    loop = asyncio.get_running_loop()
+    try:
+        stat = await loop.run_in_executor(None, settings.cookies_path.stat)
+    except FileNotFoundError:
+        return {"has_cookies": False}
+    return {
+        "has_cookies": True,
+        "file_size": stat.st_size,
+        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+    }
 
 
 @router.post("/cookies")
@@ -778,20 +835,37 @@ async def upload_cookies(file: UploadFile = File(...)):
     if not file.filename.endswith(".txt"):
         raise HTTPException(status_code=400, detail="File must be a .txt file")
 
-    content = await file.read()
-
-    # Basic validation - check if it looks like a Netscape cookie file
-    content_str = content.decode("utf-8", errors="ignore")
-    if not ("# Netscape HTTP Cookie File" in content_str or "# HTTP Cookie File" in content_str or ".youtube.com" in content_str):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid cookie file format. Please export cookies in Netscape/Mozilla format.",
-        )
+    # Stream the upload to a temporary file in chunks, so the whole file is
+    # never held in memory and an invalid upload leaves existing cookies alone
+    ensure_dir(settings.cookies_path.parent)
+    tmp_path = settings.cookies_path.with_name(settings.cookies_path.name + ".tmp")
+    loop = asyncio.get_running_loop()
+    valid = False
+    tail = b""
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := await file.read(COOKIE_UPLOAD_CHUNK_SIZE):
+                # Basic validation - check if it looks like a Netscape cookie file.
+                # The markers are ASCII, so the raw bytes are searched without
+                # decoding; the end of the previous chunk is kept so markers
+                # split across chunks are still found.
+                if not valid:
+                    window = tail + chunk
+                    valid = any(marker in window for marker in COOKIE_FILE_MARKERS)
+                    tail = window[-COOKIE_MARKER_OVERLAP:]
+                await loop.run_in_executor(None, f.write, chunk)
+
+        if not valid:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid cookie file format. Please export cookies in Netscape/Mozilla format.",
+            )
 
-    # Save the file
-    settings.cookies_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(settings.cookies_path, "wb") as f:
-        f.write(content)
+        # Save the file
+        os.replace(tmp_path, settings.cookies_path)
+        downloader_service.invalidate_cookies()
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     return {"success": True, "message": "Cookies uploaded successfully"}
 
@@ -808,6 +882,7 @@ async def delete_cookies():
     """Delete the cookies file."""
     if settings.cookies_path.exists():
         settings.cookies_path.unlink()
+        downloader_service.invalidate_cookies()
         return {"success": True, "message": "Cookies deleted"}
     return {"success": False, "message": "No cookies file found"}
 
@@ -815,7 +890,7 @@ async def delete_cookies():
 # Settings Endpoints
 
 @router.get("/settings/download-options")
-async def get_download_options(db: AsyncSession = Depends(get_db)):
+async def get_download_options(db: AsyncSession = Depends(get_db_readonly)):
     """Get saved download options."""
     result = await db.execute(
         select(Settings).where(Settings.key == "download_options")
@@ -845,15 +920,15 @@ async def save_download_options(options: dict, db: AsyncSession = Depends(get_db
 
 
 @router.get("/settings/max-concurrent")
-async def get_max_concurrent(db: AsyncSession = Depends(get_db)):
+async def get_max_concurrent(db: AsyncSession = Depends(get_db_readonly)):
     """Get max concurrent downloads setting."""
     result = await db.execute(
         select(Settings).where(Settings.key == "max_concurrent_downloads")
     )
     setting = result.scalar_one_or_none()
     if setting:
-        return {"value": setting.value.get("value", settings.max_concurrent_downloads)}
-    return {"value": settings.max_concurrent_downloads}
+        return {"value": setting.value.get("value", MAX_CONCURRENT_DOWNLOADS)}
+    return {"value": MAX_CONCURRENT_DOWNLOADS}
 
 
 @router.put("/settings/max-concurrent")
@@ -889,7 +964,7 @@ async def set_max_concurrent(data: dict, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/settings/output-path-presets")
-async def get_output_path_presets(db: AsyncSession = Depends(get_db)):
+async def get_output_path_presets(db: AsyncSession = Depends(get_db_readonly)):
     """Get saved output path presets."""
     result = await db.execute(
         select(Settings).where(Settings.key == "output_path_presets")
@@ -953,6 +1028,9 @@ async def delete_output_path_preset(name: str, db: AsyncSession = Depends(get_db
         raise HTTPException(status_code=404, detail="Preset not found")
 
     setting.value = {"presets": presets}
+    if name == "Default":
+        # Let the next startup restore the Default preset
+        await clear_default_presets_marker(db)
     await db.commit()
     return {"success": True, "presets": presets}
 
@@ -960,7 +1038,7 @@ async def delete_output_path_preset(name: str, db: AsyncSession = Depends(get_db
 # yt-dlp Version Management
 
 @router.get("/yt-dlp/version")
-async def get_ytdlp_version():
+async def get_ytdlp_version(request: Request):
     """Get current yt-dlp version and check for updates."""
     from packaging import version
 
@@ -968,30 +1046,37 @@ async def get_ytdlp_version():
     logger.info(f"Checking yt-dlp version. Current: {current_version}")
 
     # Check PyPI for latest version
+    global _pypi_cache
     latest_version = None
     update_available = False
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+    cached_version, checked_at = _pypi_cache
+    if cached_version and time.monotonic() - checked_at < PYPI_VERSION_TTL:
+        latest_version = cached_version
+    else:
+        try:
+            response = await request.app.state.http.get(
                 "https://pypi.org/pypi/yt-dlp/json",
                 timeout=10.0
             )
             if response.status_code == 200:
                 data = response.json()
                 latest_version = data["info"]["version"]
-                # Use proper version comparison - only update if latest is greater
-                try:
-                    update_available = version.parse(latest_version) > version.parse(current_version)
-                    logger.info(f"yt-dlp version check complete. Latest: {latest_version}, Update available: {update_available}")
-                except Exception as e:
-                    # Fallback to string comparison if parsing fails
-                    logger.warning(f"Failed to parse versions for comparison: {e}. Falling back to string comparison.")
-                    update_available = latest_version != current_version
+                _pypi_cache = (latest_version, time.monotonic())
             else:
                 logger.warning(f"Failed to fetch yt-dlp version from PyPI. Status code: {response.status_code}")
-    except Exception as e:
-        logger.error(f"Error checking for yt-dlp updates: {e}")
+        except Exception as e:
+            logger.error(f"Error checking for yt-dlp updates: {e}")
+
+    if latest_version:
+        # Use proper version comparison - only update if latest is greater
+        try:
+            update_available = version.parse(latest_version) > version.parse(current_version)
+            logger.info(f"yt-dlp version check complete. Latest: {latest_version}, Update available: {update_available}")
+        except Exception as e:
+            # Fallback to string comparison if parsing fails
+            logger.warning(f"Failed to parse versions for comparison: {e}. Falling back to string comparison.")
+            update_available = latest_version != current_version
 
     return {
         "current_version": current_version,
@@ -1004,21 +1089,28 @@ async def get_ytdlp_version():
 # Database Maintenance Endpoints
 
 @router.get("/maintenance/stats")
-async def get_database_stats(db: AsyncSession = Depends(get_db)):
+async def get_database_stats(db: AsyncSession = Depends(get_db_readonly)):
     """Get database statistics."""
-    # Count downloads by status
-    downloads_result = await db.execute(
-        select(Download.status, func.count(Download.id)).group_by(Download.status)
+    # Count downloads by status and downloaded videos (history) in one query
+    result = await db.execute(
+        select(literal("downloads"), Download.status, func.count(Download.id))
+        .group_by(Download.status)
+        .union_all(
+            select(literal("history"), null(), func.count(DownloadedVideo.id))
+        )
     )
-    downloads_by_status = {str(status): count for status, count in downloads_result.fetchall()}
+
+    downloads_by_status = {}
+    total_history = 0
+    for kind, status, count in result.fetchall():
+        if kind == "history":
+            total_history = count
+        else:
+            downloads_by_status[str(status)] = count
 
     # Total downloads
     total_downloads = sum(downloads_by_status.values())
 
-    # Count downloaded videos (history)
-    history_result = await db.execute(select(func.count(DownloadedVideo.id)))
-    total_history = history_result.scalar()
-
     return {
         "downloads": {
             "total": total_downloads,
@@ -1042,7 +1134,7 @@ async def cleanup_old_downloads(
     cutoff_date = datetime.utcnow() - timedelta(days=days)
 
     # Build query for non-active downloads older than cutoff
-    query = select(Download).where(
+    query = delete(Download).where(
         Download.created_at < cutoff_date,
         Download.status.in_([
             DownloadStatus.COMPLETED,
@@ -1058,21 +1150,15 @@ async def cleanup_old_downloads(
             "failed": DownloadStatus.FAILED,
         }
         if status in status_map:
-            query = select(Download).where(
+            query = delete(Download).where(
                 Download.created_at < cutoff_date,
                 Download.status == status_map[status]
             )
 
     result = await db.execute(query)
-    downloads = result.scalars().all()
-
-    count = len(downloads)
-    for download in downloads:
-        await db.delete(download)
-
     await db.commit()
 
-    return {"deleted": count, "older_than_days": days}
+    return {"deleted": result.rowcount, "older_than_days": days}
 
 
 @router.delete("/maintenance/history")
@@ -1086,24 +1172,19 @@ async def clear_download_history(
     if days:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         result = await db.execute(
-            select(DownloadedVideo).where(DownloadedVideo.downloaded_at < cutoff_date)
+            delete(DownloadedVideo).where(DownloadedVideo.downloaded_at < cutoff_date)
         )
     else:
-        result = await db.execute(select(DownloadedVideo))
-
-    videos = result.scalars().all()
-    count = len(videos)
-
-    for video in videos:
-        await db.delete(video)
+        result = await db.execute(delete(DownloadedVideo))
 
     await db.commit()
+    invalidate_downloaded_video_ids()
 
-    return {"deleted": count}
+    return {"deleted": result.rowcount}
 
 
 @router.get("/maintenance/history/channels")
-async def get_history_channels(db: AsyncSession = Depends(get_db)):
+async def get_history_channels(db: AsyncSession = Depends(get_db_readonly)):
     """Get list of channels in download history with video counts."""
     result = await db.execute(
         select(
@@ -1114,15 +1195,10 @@ async def get_history_channels(db: AsyncSession = Depends(get_db)):
         .order_by(func.count(DownloadedVideo.id).desc())
     )
 
-    channels = []
-    for row in result.fetchall():
-        channel_name = row[0] or "Unknown"
-        channels.append({
-            "channel": channel_name,
-            "count": row[1]
-        })
-
-    return channels
+    return [
+        {"channel": channel or "Unknown", "count": count}
+        for channel, count in result
+    ]
 
 
 @router.delete("/maintenance/history/channel/{channel_name:path}")
@@ -1133,39 +1209,60 @@ async def delete_channel_history(
     """Delete download history for a specific channel."""
     if channel_name == "Unknown":
         result = await db.execute(
-            select(DownloadedVideo).where(DownloadedVideo.channel.is_(None))
+            delete(DownloadedVideo).where(DownloadedVideo.channel.is_(None))
         )
     else:
         result = await db.execute(
-            select(DownloadedVideo).where(DownloadedVideo.channel == channel_name)
+            delete(DownloadedVideo).where(DownloadedVideo.channel == channel_name)
         )
 
-    videos = result.scalars().all()
-    count = len(videos)
+    await db.commit()
+    invalidate_downloaded_video_ids()
 
-    for video in videos:
-        await db.delete(video)
+    return {"deleted": result.rowcount, "channel": channel_name}
 
-    await db.commit()
 
-    return {"deleted": count, "channel": channel_name}
+async def _run_pip_upgrade() -> tuple[int, str, str]:
+    """
+    Run pip install --upgrade yt-dlp.
+
+    Uses an asyncio subprocess so no executor thread is tied up for the
+    length of the install. The SelectorEventLoop used on Windows has no
+    subprocess support, so there it falls back to subprocess.run in a
+    worker thread.
+
+    Returns:
+        Tuple of (return code, stdout, stderr).
+    """
+    command = [sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"]
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except NotImplementedError:
+        result = await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: subprocess.run(command, capture_output=True, text=True)
+        )
+        return result.returncode, result.stdout, result.stderr
+
+    stdout, stderr = await process.communicate()
+    return (
+        process.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace"),
+    )
 
 
 @router.post("/yt-dlp/update")
 async def update_ytdlp(restart: bool = False):
     """Update yt-dlp to the latest version."""
     try:
-        # Run pip install --upgrade yt-dlp
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: subprocess.run(
-                [sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"],
-                capture_output=True,
-                text=True
-            )
-        )
+        returncode, stdout, stderr = await _run_pip_upgrade()
 
-        if result.returncode == 0:
+        if returncode == 0:
             message = "yt-dlp updated successfully."
             if restart:
                 message += " Server will restart in 2 seconds..."
@@ -1177,14 +1274,14 @@ async def update_ytdlp(restart: bool = False):
             return {
                 "success": True,
                 "message": message,
-                "output": result.stdout,
+                "output": stdout,
                 "restarting": restart
             }
         else:
             return {
                 "success": False,
                 "message": "Update failed",
-                "error": result.stderr
+                "error": stderr
             }
     except Exception as e:
         logger.error(f"Failed to update yt-dlp: {e}")
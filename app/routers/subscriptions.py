@@ -1,20 +1,25 @@
 import asyncio
 import fnmatch
+import heapq
 import logging
+import re
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db, async_session
-from app.models import Subscription, DownloadedVideo, Download, DownloadStatus
+from app.database import get_db, get_db_readonly, async_session
+from app.models import Subscription, Download, DownloadStatus
 from app.schemas import (
     SubscriptionCreate,
     SubscriptionResponse,
     SubscriptionUpdate,
-    DownloadOptions,
 )
 from app.services.downloader import downloader_service
 from app.routers.websocket import manager
@@ -23,12 +28,100 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 
-# Background task reference
-subscription_checker_task: Optional[asyncio.Task] = None
+# Columns returned by list_subscriptions, matching SubscriptionResponse
+SUBSCRIPTION_RESPONSE_COLUMNS = tuple(
+    getattr(Subscription, field) for field in SubscriptionResponse.model_fields
+)
+
+# Minimum delay before a subscription whose check did not complete is
+# checked again
+SUBSCRIPTION_RETRY_DELAY = timedelta(minutes=5)
+
+# How many subscriptions the background checker checks at the same time.
+# Each check is a yt-dlp playlist extraction, so this also bounds the load
+# put on the remote site.
+MAX_CONCURRENT_SUBSCRIPTION_CHECKS = 8
 
+# How long a fetched playlist is reused by other subscriptions that point
+# at the same URL, in seconds. Fetches still in progress are always shared.
+PLAYLIST_CACHE_TTL = 300
 
-async def check_subscription(subscription_id: int):
-    """Check a subscription for new videos and queue downloads."""
+# Playlist fetches by URL: (fetch task, time the fetch started)
+_playlist_fetches: dict[str, tuple[asyncio.Task, float]] = {}
+
+# Background task reference, and the event that wakes it when the schedule
+# changes
+subscription_checker_task: Optional[asyncio.Task] = None
+_schedule_changed: Optional[asyncio.Event] = None
+
+
+@lru_cache(maxsize=128)
+def _title_filter_regex(pattern: str) -> re.Pattern:
+    """
+    Compile a subscription title filter into a case-insensitive regex.
+
+    The wildcard pattern is translated once and cached, so repeated checks
+    of the same subscription reuse the compiled regex.
+
+    Args:
+        pattern: Wildcard pattern (supports * and ?).
+
+    Returns:
+        Compiled regex matching lowercased titles.
+    """
+    return re.compile(fnmatch.translate(pattern.lower()))
+
+
+async def _get_playlist_entries(url: str, use_cache: bool = True):
+    """
+    Fetch a playlist's entries, sharing the fetch between subscriptions.
+
+    Subscriptions that point at the same channel or playlist reuse a fetch
+    that is in progress or finished within PLAYLIST_CACHE_TTL seconds,
+    instead of each running their own yt-dlp extraction. Failed or
+    cancelled fetches are not reused.
+
+    Args:
+        url: Playlist or channel URL.
+        use_cache: Whether a recent fetch may be reused. A fresh fetch is
+            always stored for later callers.
+
+    Returns:
+        Tuple of (playlist title, entries).
+    """
+    now = time.monotonic()
+    for cached_url, (task, started) in list(_playlist_fetches.items()):
+        if task.done() and (
+            now - started >= PLAYLIST_CACHE_TTL
+            or task.cancelled()
+            or task.exception() is not None
+        ):
+            del _playlist_fetches[cached_url]
+
+    cached = _playlist_fetches.get(url)
+    if cached is not None and (use_cache or not cached[0].done()):
+        task = cached[0]
+    else:
+        task = asyncio.create_task(downloader_service.get_playlist_entries(url))
+        _playlist_fetches[url] = (task, now)
+
+    # Shielded so that one cancelled check doesn't cancel the shared fetch
+    return await asyncio.shield(task)
+
+
+async def check_subscription(subscription_id: int, use_cache: bool = True) -> Optional[int]:
+    """
+    Check a subscription for new videos and queue downloads.
+
+    Args:
+        subscription_id: ID of the subscription to check.
+        use_cache: Whether a recent fetch of the same playlist by another
+            subscription may be reused.
+
+    Returns:
+        Number of new videos queued (0 if the check failed), or None if the
+        subscription does not exist.
+    """
     async with async_session() as db:
         try:
             # Fetch subscription within this session so updates persist
@@ -37,118 +130,200 @@ async def check_subscription(subscription_id: int):
             )
             subscription = result.scalar_one_or_none()
             if not subscription:
-                print(f"Subscription {subscription_id} not found")
-                return 0
-
-            # Get already downloaded video IDs
-            result = await db.execute(select(DownloadedVideo.video_id))
-            downloaded_ids = set(row[0] for row in result.fetchall())
+                logger.warning(f"Subscription {subscription_id} not found")
+                return None
 
-            # Get playlist entries
-            title, entries = await downloader_service.get_playlist_entries(
-                subscription.url, downloaded_ids
-            )
+            # Get playlist entries; history is checked below, only for the
+            # entries that survive the filters
+            title, entries = await _get_playlist_entries(subscription.url, use_cache)
 
-            # Filter out members-only videos if not included
-            if not subscription.include_members:
-                entries = [e for e in entries if not e.members_only]
+            # Apply the filters in a single lazy pass, in playlist order
+            # (newest first), so that with keep_last_n set the scan stops
+            # once enough videos have passed
+            playlist_count = len(entries)
+            skip_members = not subscription.include_members
 
             # Filter by title pattern if set (supports wildcards like * and ?)
+            match = None
             if subscription.title_filter:
-                pattern = subscription.title_filter
-                original_count = len(entries)
-                entries = [e for e in entries if fnmatch.fnmatch(e.title.lower(), pattern.lower())]
-                logger.info(f"Title filter '{pattern}' matched {len(entries)}/{original_count} videos for {subscription.name}")
+                match = _title_filter_regex(subscription.title_filter).match
+
+            filtered = (
+                e for e in entries
+                if not (skip_members and e.members_only)
+                and (match is None or match(e.title.lower()))
+            )
 
             # Limit to keep_last_n newest videos if set
             if subscription.keep_last_n and subscription.keep_last_n > 0:
-                entries = entries[:subscription.keep_last_n]
+                filtered = islice(filtered, subscription.keep_last_n)
+
+            entries = list(filtered)
+            if subscription.title_filter:
+                logger.info(f"Title filter '{subscription.title_filter}' kept {len(entries)}/{playlist_count} videos for {subscription.name}")
 
             # Find new videos (not already downloaded)
-            new_videos = [e for e in entries if not e.already_downloaded]
+            from app.routers.downloads import get_downloaded_video_ids
+            downloaded_ids = await get_downloaded_video_ids(db)
+            new_videos = [e for e in entries if e.video_id not in downloaded_ids]
 
+            # Queue downloads for new videos with one multi-row INSERT
+            new_downloads = []
             if new_videos:
-                # Queue downloads for new videos
-                options = DownloadOptions(**subscription.options)
-
-                for entry in new_videos:
-                    video_url = f"https://www.youtube.com/watch?v={entry.video_id}"
-
-                    # Create download record
-                    download = Download(
-                        url=video_url,
-                        video_id=entry.video_id,
-                        title=entry.title,
-                        options=subscription.options,
-                        status=DownloadStatus.QUEUED,
-                    )
-                    db.add(download)
-                    await db.commit()
-                    await db.refresh(download)
-
-                    # Broadcast new download
-                    await manager.broadcast({
-                        "type": "new_download",
-                        "id": download.id,
-                        "title": download.title,
-                        "url": download.url,
-                        "subscription": subscription.name,
-                    })
-
-                    # Start download in background
-                    from app.routers.downloads import process_download
-                    asyncio.create_task(
-                        process_download(download.id, video_url, subscription.options)
-                    )
+                # subscription.options was validated when the subscription
+                # was created or updated, so it is stored and passed on as-is
+                result = await db.execute(
+                    insert(Download).returning(Download.id, Download.title, Download.url),
+                    [
+                        {
+                            "url": f"https://www.youtube.com/watch?v={entry.video_id}",
+                            "video_id": entry.video_id,
+                            "title": entry.title,
+                            "options": subscription.options,
+                            "status": DownloadStatus.QUEUED.value,
+                        }
+                        for entry in new_videos
+                    ],
+                )
+                new_downloads = result.all()
 
             # Update subscription last_checked and video count
             subscription.last_checked = datetime.utcnow()
             subscription.last_video_count = len(entries)
             await db.commit()
 
+            if new_downloads:
+                # Broadcast the new downloads in one message
+                if manager.has_clients():
+                    await manager.broadcast({
+                        "type": "new_downloads",
+                        "subscription": subscription.name,
+                        "items": [
+                            {"id": download_id, "title": title, "url": url}
+                            for download_id, title, url in new_downloads
+                        ],
+                    })
+
+                # Start downloads in background
+                from app.routers.downloads import start_download_task
+                for download_id, _, url in new_downloads:
+                    start_download_task(download_id, url, subscription.options)
+
             return len(new_videos)
 
         except Exception as e:
-            print(f"Error checking subscription {subscription_id}: {e}")
+            logger.error(f"Error checking subscription {subscription_id}: {e}")
             return 0
 
 
+async def _load_check_schedule(
+    last_attempts: dict[int, datetime],
+) -> list[tuple[datetime, int, str]]:
+    """
+    Build a heap of upcoming checks for all enabled subscriptions.
+
+    Args:
+        last_attempts: When each subscription was last checked by the loop,
+            used to hold back retries of checks that did not complete.
+
+    Returns:
+        Heap of (next check time, subscription ID, name) tuples.
+    """
+    async with async_session() as db:
+        result = await db.execute(
+            select(
+                Subscription.id,
+                Subscription.name,
+                Subscription.last_checked,
+                Subscription.check_interval_hours,
+            ).where(Subscription.enabled == True)
+        )
+        rows = result.all()
+
+    schedule = []
+    for sub_id, name, last_checked, interval_hours in rows:
+        if last_checked is None:
+            next_check = datetime.min
+        else:
+            next_check = last_checked + timedelta(hours=interval_hours)
+        last_attempt = last_attempts.get(sub_id)
+        if last_attempt is not None:
+            next_check = max(next_check, last_attempt + SUBSCRIPTION_RETRY_DELAY)
+        schedule.append((next_check, sub_id, name))
+    heapq.heapify(schedule)
+    return schedule
+
+
 async def subscription_checker_loop():
-    """Background loop that checks subscriptions periodically."""
+    """
+    Background loop that checks subscriptions when they are due.
+
+    Sleeps until the earliest next check time, or until the schedule is
+    changed through the API, instead of polling on a fixed interval.
+    """
+    last_attempts: dict[int, datetime] = {}
     while True:
         try:
-            async with async_session() as db:
-                # Get all enabled subscriptions
-                result = await db.execute(
-                    select(Subscription).where(Subscription.enabled == True)
-                )
-                subscriptions = result.scalars().all()
-
-                for sub in subscriptions:
-                    # Check if it's time to check this subscription
-                    if sub.last_checked is None:
-                        should_check = True
-                    else:
-                        next_check = sub.last_checked + timedelta(hours=sub.check_interval_hours)
-                        should_check = datetime.utcnow() >= next_check
-
-                    if should_check:
-                        print(f"Checking subscription: {sub.name}")
-                        new_count = await check_subscription(sub.id)
-                        if new_count > 0:
-                            print(f"Found {new_count} new videos for {sub.name}")
+            _schedule_changed.clear()
+            schedule = await _load_check_schedule(last_attempts)
+
+            now = datetime.utcnow()
+            if schedule and schedule[0][0] <= now:
+                due = []
+                while schedule and schedule[0][0] <= now:
+                    _, sub_id, name = heapq.heappop(schedule)
+                    last_attempts[sub_id] = now
+                    due.append((sub_id, name))
+
+                # Check due subscriptions concurrently, a few at a time
+                semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUBSCRIPTION_CHECKS)
+
+                async def check_with_limit(sub_id: int, name: str):
+                    async with semaphore:
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"Checking subscription: {name}")
+                        new_count = await check_subscription(sub_id)
+                        if new_count:
+                            logger.info(f"Found {new_count} new videos for {name}")
+
+                await asyncio.gather(*(check_with_limit(sub_id, name) for sub_id, name in due))
+
+                # The checks moved their own deadlines and took time, so
+                # pick up the new schedule before deciding how long to sleep
+                schedule = await _load_check_schedule(last_attempts)
+
+            if last_attempts:
+                # Forget attempts that no longer hold back a retry
+                cutoff = datetime.utcnow() - SUBSCRIPTION_RETRY_DELAY
+                last_attempts = {k: v for k, v in last_attempts.items() if v > cutoff}
+
+            # Sleep until the next check is due
+            timeout = None
+            if schedule:
+                timeout = max(0.0, (schedule[0][0] - datetime.utcnow()).total_seconds())
 
         except Exception as e:
-            print(f"Error in subscription checker loop: {e}")
+            logger.error(f"Error in subscription checker loop: {e}")
+            timeout = SUBSCRIPTION_RETRY_DELAY.total_seconds()
 
-        # Wait 5 minutes before next check cycle
-        await asyncio.sleep(300)
+        # Wake early if a subscription is added, changed or removed
+        try:
+            await asyncio.wait_for(_schedule_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def notify_schedule_changed():
+    """Wake the subscription checker so it picks up a changed schedule."""
+    if _schedule_changed is not None:
+        _schedule_changed.set()
 
 
 def start_subscription_checker():
     """Start the background subscription checker."""
-    global subscription_checker_task
+    global subscription_checker_task, _schedule_changed
     if subscription_checker_task is None or subscription_checker_task.done():
+        _schedule_changed = asyncio.Event()
         subscription_checker_task = asyncio.create_task(subscription_checker_loop())
 
 
@@ -185,23 +360,30 @@ async def create_subscription(
     await db.commit()
     await db.refresh(subscription)
 
-    # Start the checker if not running
+    # Start the checker if not running, and let it schedule the new one
     start_subscription_checker()
+    notify_schedule_changed()
 
     return subscription
 
 
 @router.get("", response_model=list[SubscriptionResponse])
-async def list_subscriptions(db: AsyncSession = Depends(get_db)):
-    """List all subscriptions."""
+async def list_subscriptions(db: AsyncSession = Depends(get_db_readonly)):
+    """
+    List all subscriptions.
+
+    Selects just the response columns and returns them as plain dicts,
+    skipping ORM object loading and response model validation; the
+    response_model still documents the shape.
+    """
     result = await db.execute(
-        select(Subscription).order_by(Subscription.created_at.desc())
+        select(*SUBSCRIPTION_RESPONSE_COLUMNS).order_by(Subscription.created_at.desc())
     )
-    return result.scalars().all()
+    return ORJSONResponse([dict(row) for row in result.mappings()])
 
 
 @router.get("/{subscription_id}", response_model=SubscriptionResponse)
-async def get_subscription(subscription_id: int, db: AsyncSession = Depends(get_db)):
+async def get_subscription(subscription_id: int, db: AsyncSession = Depends(get_db_readonly)):
     """Get a specific subscription."""
     result = await db.execute(
         select(Subscription).where(Subscription.id == subscription_id)
@@ -219,32 +401,39 @@ async def update_subscription(
     db: AsyncSession = Depends(get_db),
 ):
     """Update a subscription."""
-    result = await db.execute(
-        select(Subscription).where(Subscription.id == subscription_id)
-    )
-    subscription = result.scalar_one_or_none()
-    if not subscription:
-        raise HTTPException(status_code=404, detail="Subscription not found")
-
+    values = {}
     if data.name is not None:
-        subscription.name = data.name
+        values["name"] = data.name
     if data.check_interval_hours is not None:
-        subscription.check_interval_hours = data.check_interval_hours
+        values["check_interval_hours"] = data.check_interval_hours
     if data.enabled is not None:
-        subscription.enabled = data.enabled
+        values["enabled"] = data.enabled
     if data.options is not None:
-        subscription.options = data.options.model_dump()
+        values["options"] = data.options.model_dump()
     if data.keep_last_n is not None:
         # Allow setting to None by passing 0 or negative
-        subscription.keep_last_n = data.keep_last_n if data.keep_last_n > 0 else None
+        values["keep_last_n"] = data.keep_last_n if data.keep_last_n > 0 else None
     if data.include_members is not None:
-        subscription.include_members = data.include_members
+        values["include_members"] = data.include_members
     if data.title_filter is not None:
         # Allow clearing by passing empty string
-        subscription.title_filter = data.title_filter if data.title_filter else None
+        values["title_filter"] = data.title_filter if data.title_filter else None
+
+    if values:
+        # Apply the changes and read back the row in a single statement
+        subscription = await db.scalar(
+            update(Subscription)
+            .where(Subscription.id == subscription_id)
+            .values(**values)
+            .returning(Subscription)
+        )
+    else:
+        subscription = await db.get(Subscription, subscription_id)
+    if not subscription:
+        raise HTTPException(status_code=404, detail="Subscription not found")
 
     await db.commit()
-    await db.refresh(subscription)
+    notify_schedule_changed()
     return subscription
 
 
@@ -252,29 +441,21 @@ async def update_subscription(
 async def delete_subscription(subscription_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a subscription."""
     result = await db.execute(
-        select(Subscription).where(Subscription.id == subscription_id)
+        delete(Subscription).where(Subscription.id == subscription_id)
     )
-    subscription = result.scalar_one_or_none()
-    if not subscription:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Subscription not found")
 
-    await db.delete(subscription)
     await db.commit()
+    notify_schedule_changed()
     return {"status": "deleted"}
 
 
 @router.post("/{subscription_id}/check")
-async def check_subscription_now(
-    subscription_id: int,
-    db: AsyncSession = Depends(get_db),
-):
+async def check_subscription_now(subscription_id: int):
     """Manually trigger a check for new videos."""
-    result = await db.execute(
-        select(Subscription).where(Subscription.id == subscription_id)
-    )
-    subscription = result.scalar_one_or_none()
-    if not subscription:
+    new_count = await check_subscription(subscription_id, use_cache=False)
+    if new_count is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
-
-    new_count = await check_subscription(subscription_id)
+    notify_schedule_changed()
     return {"new_videos": new_count}
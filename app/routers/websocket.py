@@ -7,13 +7,17 @@ live download progress updates, status changes, and notifications.
 
 import asyncio
 import logging
-from typing import Set
+from typing import Optional, Set
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import json
+import orjson
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# How long the sender waits after being woken so that updates arriving
+# close together go out in one frame
+BATCH_WINDOW = 0.02
+
 
 class ConnectionManager:
     """
@@ -21,10 +25,19 @@ class ConnectionManager:
 
     Tracks all active client connections and provides methods for
     broadcasting messages to all clients or sending to specific ones.
+
+    Broadcasts are collected in a pending list and sent by a single
+    background task, woken by an event, as one JSON array frame. A progress
+    update replaces the pending progress update for the same download, so
+    while a send is in flight only the latest value waits to go out.
     """
 
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
+        self._pending: list[dict] = []
+        self._progress_index: dict = {}
+        self._dirty: Optional[asyncio.Event] = None
+        self._sender: Optional[asyncio.Task] = None
 
     async def connect(self, websocket: WebSocket):
         """Accept a new WebSocket connection and add to active set."""
@@ -37,12 +50,29 @@ class ConnectionManager:
         self.active_connections.discard(websocket)
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
+    def has_clients(self) -> bool:
+        """
+        Check whether any client is connected.
+
+        Lets producers skip building messages nobody will receive. Safe to
+        call from worker threads.
+        """
+        return bool(self.active_connections)
+
     async def broadcast(self, message: dict):
         """
         Broadcast a message to all connected clients.
 
-        Automatically handles disconnected clients by removing them
-        from the active connections set.
+        Args:
+            message: Dictionary to send as JSON to all clients.
+        """
+        self.publish(message)
+
+    def publish(self, message: dict):
+        """
+        Queue a message for broadcast without waiting for it to be sent.
+
+        Must be called from the event loop thread.
 
         Args:
             message: Dictionary to send as JSON to all clients.
@@ -51,19 +81,62 @@ class ConnectionManager:
             logger.warning("No active WebSocket connections for broadcast")
             return
 
-        # Make a copy to avoid modification during iteration
-        connections = list(self.active_connections)
-        disconnected = []
+        # A progress message overwrites the pending progress message for the
+        # same download unless another message for that download was queued
+        # in between, so ordering between message types is preserved
+        download_id = message.get("id")
+        if message.get("type") == "progress":
+            index = self._progress_index.get(download_id)
+            if index is not None:
+                self._pending[index] = message
+                return
+            self._progress_index[download_id] = len(self._pending)
+        else:
+            self._progress_index.pop(download_id, None)
+        self._pending.append(message)
+
+        if self._sender is None or self._sender.done():
+            self._dirty = asyncio.Event()
+            self._sender = asyncio.create_task(self._send_batches())
+        self._dirty.set()
+
+    async def _send_batches(self):
+        """Send the pending messages as one frame whenever there are any."""
+        dirty = self._dirty
+        while True:
+            await dirty.wait()
+            await asyncio.sleep(BATCH_WINDOW)
+            dirty.clear()
+            messages = self._pending
+            self._pending = []
+            self._progress_index = {}
 
-        for connection in connections:
             try:
-                await connection.send_json(message)
+                await self._send_all(messages)
             except Exception as e:
-                logger.error(f"WebSocket send error: {e}")
-                disconnected.append(connection)
+                logger.error(f"WebSocket broadcast error: {e}")
+
+    async def _send_all(self, messages: list[dict]):
+        """
+        Send a batch to every connected client as a JSON array.
+
+        Automatically handles disconnected clients by removing them
+        from the active connections set.
+        """
+        # Make a copy to avoid modification during iteration
+        connections = list(self.active_connections)
+        if not connections:
+            return
 
-        for conn in disconnected:
-            self.active_connections.discard(conn)
+        payload = orjson.dumps(messages).decode()
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True,
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"WebSocket send error: {result}")
+                self.active_connections.discard(connection)
 
     async def send_to(self, websocket: WebSocket, message: dict):
         """
@@ -74,7 +147,7 @@ class ConnectionManager:
             message: Dictionary to send as JSON.
         """
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(orjson.dumps(message).decode())
         except Exception:
             self.active_connections.discard(websocket)
 
@@ -96,8 +169,13 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive, receive any client messages
-            data = await websocket.receive_text()
-            # Client messages could be used for ping/pong or commands
+            # Keep the connection open until the client goes away. Clients
+            # don't send anything meaningful, so any message is dropped
+            # without being decoded.
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
@@ -21,7 +21,7 @@ class DownloadOptions(BaseModel):
         output_format: Desired output container format.
         output_template: yt-dlp output template with variables like %(title)s.
         subtitles: Whether to download subtitles.
-        subtitle_langs: List of subtitle language codes to download.
+        subtitle_langs: Subtitle language codes to download.
         embed_thumbnail: Whether to embed thumbnail in the output file.
         embed_metadata: Whether to embed metadata in the output file.
     """
@@ -29,7 +29,7 @@ class DownloadOptions(BaseModel):
     output_format: str = "mp4"
     output_template: str = "%(channel)s/%(upload_date)s_%(title)s.%(ext)s"
     subtitles: bool = False
-    subtitle_langs: list[str] = Field(default_factory=lambda: ["en"])
+    subtitle_langs: tuple[str, ...] = ("en",)
     embed_thumbnail: bool = False
     embed_metadata: bool = True
 
@@ -15,20 +15,411 @@ import logging
 import os
 import subprocess
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Optional
+from typing import AbstractSet, Callable, Optional
 import re
 import sys
 import threading
+import time
 
+import orjson
 import yt_dlp
 
-from app.config import settings
-from app.schemas import DownloadOptions, PlaylistEntry
+from app.config import settings, DOWNLOADS_DIR
+from app.schemas import DownloadOptions
 
 logger = logging.getLogger(__name__)
 
+# yt-dlp progress line, e.g. "[download]  45.2% of 100.00MiB at 5.23MiB/s
+# ETA 00:30". One scan picks up the percentage and, when present, the speed
+# (both "at X" and "~X" forms) and the ETA.
+_PROGRESS_RE = re.compile(
+    r'(?P<pct>\d+\.?\d*)%'
+    r'(?:.*?(?:at|~)\s*(?P<speed>[\d.]+\s*\w+/s))?'
+    r'(?:.*?ETA\s+(?P<eta>\d+:\d+(?::\d+)?))?'
+)
+# Fragment counter on progress lines of fragmented downloads: "(frag 3/10)"
+_FRAGMENT_RE = re.compile(r'\(frag\s+(\d+)/(\d+)\)')
+
+# Have yt-dlp print each progress update as its progress dict in JSON, so
+# values are read from fields instead of matched out of formatted text
+PROGRESS_TEMPLATE = "download:%(progress)j"
+
+
+def _progress_field(value: Optional[str]) -> Optional[str]:
+    """Strip a preformatted yt-dlp progress field, dropping unknown values."""
+    if not value:
+        return None
+    value = value.strip()
+    if not value or value.startswith(("Unknown", "N/A")):
+        return None
+    return value
+
+
+def _parse_progress(
+    line: str,
+) -> Optional[tuple[float, Optional[str], Optional[str], bool, Optional[str]]]:
+    """
+    Parse a yt-dlp progress line.
+
+    Reads the JSON lines printed for PROGRESS_TEMPLATE, and falls back to
+    yt-dlp's text progress lines for versions that ignore the template.
+
+    Args:
+        line: Stripped line of yt-dlp output.
+
+    Returns:
+        Tuple of (percentage, speed, ETA, whether the last fragment is done,
+        file being written), or None if the line isn't a progress update.
+        The file is only known from JSON lines.
+    """
+    if line.startswith("{"):
+        try:
+            d = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return None
+        if not isinstance(d, dict) or d.get("status") not in ("downloading", "finished"):
+            return None
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        downloaded = d.get("downloaded_bytes")
+        if not total or downloaded is None:
+            return None
+        fragment_count = d.get("fragment_count")
+        return (
+            min(downloaded * 100 / total, 100.0),
+            _progress_field(d.get("_speed_str")),
+            _progress_field(d.get("_eta_str")),
+            not fragment_count or (d.get("fragment_index") or 0) >= fragment_count,
+            d.get("filename") or d.get("tmpfilename"),
+        )
+
+    if "[download]" not in line or "%" not in line:
+        return None
+    # Extract percentage, speed and ETA in one pass
+    match = _PROGRESS_RE.search(line)
+    if not match:
+        return None
+    progress = float(match.group("pct"))
+    # The fragment counter only matters once a stream is complete
+    is_final_fragment = True
+    if progress >= 99.9:
+        frag_match = _FRAGMENT_RE.search(line)
+        if frag_match:
+            is_final_fragment = int(frag_match.group(1)) >= int(frag_match.group(2))
+    return progress, match.group("speed"), match.group("eta"), is_final_fragment, None
+
+# User-friendly descriptions of the yt-dlp postprocessor steps, keyed by
+# the tag that starts their output lines
+POSTPROCESSOR_STEPS = {
+    "[Merger]": "Merging video and audio",
+    "[FFmpegVideoConvertor]": "Converting video format",
+    "[ExtractAudio]": "Extracting audio",
+    "[FFmpegMetadata]": "Embedding metadata",
+    "[EmbedThumbnail]": "Embedding thumbnail",
+    "[FFmpegEmbedSubtitle]": "Embedding subtitles",
+    "[FFmpegVideoRemuxer]": "Remuxing video",
+    "[MoveFiles]": "Moving files",
+    "[ModifyChapters]": "Processing chapters",
+    "[SponsorBlock]": "Processing sponsor segments",
+}
+
+# The same descriptions keyed by postprocessor name, as reported to the
+# in-process postprocessor hook
+POSTPROCESSOR_NAMES = {
+    "Merger": "Merging video and audio",
+    "FFmpegVideoConvertor": "Converting video format",
+    "FFmpegExtractAudio": "Extracting audio",
+    "FFmpegMetadata": "Embedding metadata",
+    "EmbedThumbnail": "Embedding thumbnail",
+    "FFmpegEmbedSubtitle": "Embedding subtitles",
+}
+
+# Output formats that are extracted as audio or remuxed/converted as video
+AUDIO_FORMATS = frozenset({"mp3", "m4a", "opus", "flac", "wav", "aac"})
+VIDEO_FORMATS = frozenset({"mp4", "mkv", "webm", "avi", "mov"})
+
+# Byte units for formatting download speeds
+_KB = 1 << 10
+_MB = 1 << 20
+
+
+@lru_cache(maxsize=256)
+def _format_duration(seconds: int) -> str:
+    """
+    Format a duration or ETA in seconds as M:SS, or H:MM:SS from an hour up.
+
+    Cached, as consecutive progress events mostly report the same few ETAs.
+    """
+    hours, rem = divmod(seconds, 3600)
+    mins, secs = divmod(rem, 60)
+    if hours > 0:
+        return f"{hours}:{mins:02d}:{secs:02d}"
+    return f"{mins}:{secs:02d}"
+
+
+# On Windows a file can stay locked for a moment after the process that had
+# it open exits, so deletes are retried briefly instead of sleeping upfront
+UNLINK_ATTEMPTS = 3
+UNLINK_RETRY_DELAY = 0.05
+
+
+def _unlink_with_retry(path: str) -> None:
+    """
+    Delete a file, retrying briefly while it is still locked.
+
+    Args:
+        path: File to delete.
+    """
+    for attempt in range(UNLINK_ATTEMPTS):
+        try:
+            os.unlink(path)
+            return
+        except PermissionError:
+            if attempt == UNLINK_ATTEMPTS - 1:
+                raise
+            time.sleep(UNLINK_RETRY_DELAY)
+
+
+def _try_unlink(path: str) -> Optional[Exception]:
+    """Delete a file, returning the error instead of raising it."""
+    try:
+        _unlink_with_retry(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        return e
+    return None
+
+
+# Threads deleting leftover files, so a batch of deletes on a slow or
+# network filesystem waits for about one delete rather than each in turn
+UNLINK_WORKERS = 8
+
+# How long to wait for yt-dlp to exit once its output has ended
+PROCESS_EXIT_TIMEOUT = 30
+
+# Cleanups (process termination plus partial file deletion) run at once
+CLEANUP_CONCURRENCY = 2
+
+# Suffixes of the marker files yt-dlp leaves behind for an unfinished
+# download. Downloads run with --no-part, so .part files are never yt-dlp's
+# own and aren't treated as markers; fragment files (.part-Frag1, ...) share
+# the .ytdl marker's base name and go with it.
+_PARTIAL_SUFFIXES = (".ytdl",)
+
+# Minimum time between two sweeps of the downloads tree for partial files.
+# A sweep requested sooner is replaced by one trailing sweep at the end of
+# the interval.
+CLEANUP_SWEEP_INTERVAL = 5.0
+
+# How long the formats listed for a URL are reused
+FORMATS_CACHE_TTL = 60
+
+# How long a check for the cookies file is trusted before it is repeated
+COOKIES_CHECK_TTL = 1.0
+
+# Upper bound on threads reading yt-dlp download output. One is busy per
+# running download; the download semaphore keeps the real number far lower.
+DOWNLOAD_READER_THREADS = 32
+
+
+@dataclass(slots=True)
+class DownloadState:
+    """
+    Runtime state of one download, shared with its reader thread.
+
+    Attributes:
+        cancel: Set to request cancellation.
+        process: Running yt-dlp process, if started.
+        current_file: File yt-dlp is currently writing, for cleanup.
+    """
+    cancel: threading.Event = field(default_factory=threading.Event)
+    process: Optional[subprocess.Popen] = None
+    current_file: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class PlaylistItem:
+    """
+    Single video entry within a playlist or channel, for internal use.
+
+    A lightweight counterpart of the PlaylistEntry schema, which it is
+    converted to only when returned from an API endpoint. Has the same
+    fields as PlaylistEntry.
+    """
+    video_id: str
+    title: str
+    duration: Optional[int] = None
+    duration_string: Optional[str] = None
+    thumbnail: Optional[str] = None
+    uploader: Optional[str] = None
+    already_downloaded: bool = False
+    members_only: bool = False
+
+
+def _playlist_item(entry: dict, downloaded_video_ids: AbstractSet[str]) -> PlaylistItem:
+    """
+    Convert a flat yt-dlp playlist entry to a PlaylistItem.
+
+    Args:
+        entry: Entry dict from a flat playlist extraction.
+        downloaded_video_ids: Video IDs already in the download history.
+
+    Returns:
+        The PlaylistItem for the entry.
+    """
+    video_id = entry.get("id", "")
+    duration = entry.get("duration")
+    duration_string = _format_duration(int(duration)) if duration else None
+
+    # Construct YouTube thumbnail URL if not provided
+    thumbnail = entry.get("thumbnail")
+    if not thumbnail and video_id:
+        thumbnail = f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+
+    # Check for members-only status
+    availability = entry.get("availability", "")
+    members_only = availability in ("subscriber_only", "needs_premium")
+
+    # Also check title for common members-only indicators as fallback
+    title = entry.get("title", "Unknown")
+    if not members_only and title:
+        title_lower = title.lower()
+        if "(members only)" in title_lower or "[members only]" in title_lower:
+            members_only = True
+
+    return PlaylistItem(
+        video_id=video_id,
+        title=title,
+        duration=int(duration) if duration is not None else None,
+        duration_string=duration_string,
+        thumbnail=thumbnail,
+        uploader=entry.get("uploader"),
+        already_downloaded=video_id in downloaded_video_ids,
+        members_only=members_only,
+    )
+
+
+# The blocking yt-dlp calls run on the metadata thread pool. They are
+# module-level functions taking their inputs as arguments, so no closure is
+# created per call.
+
+def _ydl_extract(opts: dict, url: str) -> dict:
+    """
+    Extract info for a URL without downloading. Blocking.
+
+    Args:
+        opts: yt-dlp options.
+        url: Video, playlist or channel URL.
+
+    Returns:
+        The info dict from yt-dlp.
+    """
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def _ydl_playlist(
+    opts: dict, url: str, downloaded_video_ids: AbstractSet[str]
+) -> tuple[str, list[PlaylistItem]]:
+    """
+    Extract a playlist or channel and convert its entries. Blocking.
+
+    Args:
+        opts: yt-dlp options for a flat extraction.
+        url: Playlist or channel URL.
+        downloaded_video_ids: Video IDs already in the download history.
+
+    Returns:
+        Tuple of (playlist title, entries).
+    """
+    info = _ydl_extract(opts, url)
+    entries = [
+        _playlist_item(entry, downloaded_video_ids)
+        for entry in info.get("entries") or ()
+        if entry is not None
+    ]
+    return info.get("title", "Playlist"), entries
+
+
+def _ydl_formats(opts: dict, url: str) -> list[dict]:
+    """
+    Extract the available formats for a URL. Blocking.
+
+    Args:
+        opts: yt-dlp options.
+        url: Video URL.
+
+    Returns:
+        One dict per format with its id, extension, resolution, size and note.
+    """
+    info = _ydl_extract(opts, url)
+    return [
+        {
+            "format_id": f.get("format_id"),
+            "ext": f.get("ext"),
+            "resolution": f.get("resolution") or f"{f.get('width', '?')}x{f.get('height', '?')}",
+            "filesize": f.get("filesize"),
+            "format_note": f.get("format_note"),
+        }
+        for f in info.get("formats", [])
+    ]
+
+
+def _ydl_verify_cookies(opts: dict) -> dict:
+    """
+    Check cookies by opening the account's Watch Later playlist. Blocking.
+
+    Args:
+        opts: yt-dlp options including the cookie file.
+
+    Returns:
+        Verification result as returned by DownloaderService.verify_cookies.
+    """
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            # Try to access the user's "Watch Later" playlist - requires authentication
+            # This is faster than subscriptions feed
+            info = ydl.extract_info(
+                "https://www.youtube.com/playlist?list=WL",
+                download=False,
+            )
+            # If we get here without error, cookies are valid
+            return {
+                "valid": True,
+                "has_cookies": True,
+            }
+    except yt_dlp.utils.DownloadError as e:
+        error_msg = str(e)
+        # Check for common auth failure messages
+        if any(msg in error_msg.lower() for msg in ["sign in", "login", "private", "cookies"]):
+            return {
+                "valid": False,
+                "error": "Cookies expired or invalid - please re-export from browser",
+                "has_cookies": True,
+            }
+        # If we get a different error (like empty playlist), cookies might still be valid
+        if "empty" in error_msg.lower() or "no video" in error_msg.lower():
+            return {
+                "valid": True,
+                "has_cookies": True,
+            }
+        return {
+            "valid": False,
+            "error": error_msg,
+            "has_cookies": True,
+        }
+    except Exception as e:
+        return {
+            "valid": False,
+            "error": str(e),
+            "has_cookies": True,
+        }
+
 
 class DownloaderService:
     """
@@ -37,18 +428,57 @@ class DownloaderService:
     Uses subprocess execution for downloads to enable reliable cancellation
     on Windows. Tracks active downloads and provides progress callbacks.
 
+    Each download's output is read by a thread from a dedicated pool, so
+    long-running downloads never occupy the event loop's default executor.
+    yt-dlp metadata extraction runs on its own bounded pool as well, so
+    enumerating large playlists doesn't compete with other blocking calls.
+
     Attributes:
-        active_downloads: Map of download ID to asyncio Task.
-        _cancel_flags: Map of download ID to cancellation flag.
-        _active_processes: Map of download ID to subprocess.Popen instance.
-        _current_files: Map of download ID to current file path being downloaded.
+        _downloads: Map of download ID to its DownloadState.
+        _download_executor: Thread pool that runs the download processes.
+        _metadata_executor: Thread pool that runs yt-dlp metadata extraction.
+        _cleanup_slots: Bounds how many cleanups run at once.
+        _last_sweep_at: When the last partial file sweep started, or finished
+            if it has.
+        _trailing_sweep: Timer for the sweep that replaces skipped ones.
+        _unlink_executor: Thread pool that deletes leftover files.
+        _formats_cache: Map of URL to (time fetched, formats) for get_formats.
     """
 
     def __init__(self):
-        self.active_downloads: dict[int, asyncio.Task] = {}
-        self._cancel_flags: dict[int, bool] = {}
-        self._active_processes: dict[int, subprocess.Popen] = {}
-        self._current_files: dict[int, str] = {}
+        self._downloads: dict[int, DownloadState] = {}
+        # Environment for yt-dlp processes, built once: unbuffered output,
+        # encoded as UTF-8 whatever the platform's locale
+        self._child_env = {
+            **os.environ,
+            "PYTHONUNBUFFERED": "1",
+            "PYTHONIOENCODING": "utf-8",
+        }
+        self._cookies_present = False
+        self._cookies_checked_at = float("-inf")
+        self._cleanup_slots = asyncio.BoundedSemaphore(CLEANUP_CONCURRENCY)
+        self._last_sweep_at = float("-inf")
+        self._trailing_sweep: Optional[asyncio.TimerHandle] = None
+        # Keeps the running trailing sweep referenced until it finishes
+        self._trailing_sweep_task: Optional[asyncio.Task] = None
+        self._formats_cache: dict[str, tuple[float, list[dict]]] = {}
+        self._unlink_executor = ThreadPoolExecutor(
+            max_workers=UNLINK_WORKERS, thread_name_prefix="unlink"
+        )
+        self._download_executor = ThreadPoolExecutor(
+            max_workers=DOWNLOAD_READER_THREADS, thread_name_prefix="download"
+        )
+        self._metadata_executor = ThreadPoolExecutor(
+            max_workers=settings.metadata_workers, thread_name_prefix="ytdlp-meta"
+        )
+
+    def close(self) -> None:
+        """Shut down the worker pools, dropping work that hasn't started."""
+        if self._trailing_sweep is not None:
+            self._trailing_sweep.cancel()
+        self._metadata_executor.shutdown(wait=False, cancel_futures=True)
+        self._download_executor.shutdown(wait=False, cancel_futures=True)
+        self._unlink_executor.shutdown(wait=False, cancel_futures=True)
 
     def _get_base_opts(self) -> dict:
         """Get base options including cookies if available."""
@@ -58,13 +488,31 @@ class DownloaderService:
             "noprogress": True,  # We handle progress ourselves
             "ignoreerrors": False,
         }
-        if settings.cookies_path.exists():
+        if self.has_cookies():
             opts["cookiefile"] = str(settings.cookies_path)
         return opts
 
+    def _is_cancelled(self, download_id: int) -> bool:
+        """Check whether cancellation was requested for a download."""
+        state = self._downloads.get(download_id)
+        return state is not None and state.cancel.is_set()
+
     def has_cookies(self) -> bool:
-        """Check if cookies file exists."""
-        return settings.cookies_path.exists()
+        """
+        Check if cookies file exists.
+
+        The result is reused for COOKIES_CHECK_TTL seconds, so starting a
+        download doesn't stat the file several times over.
+        """
+        now = time.monotonic()
+        if now - self._cookies_checked_at > COOKIES_CHECK_TTL:
+            self._cookies_present = settings.cookies_path.exists()
+            self._cookies_checked_at = now
+        return self._cookies_present
+
+    def invalidate_cookies(self) -> None:
+        """Forget the cached cookies check after the file was added or removed."""
+        self._cookies_checked_at = float("-inf")
 
     async def verify_cookies(self) -> dict:
         """Verify that cookies are valid by checking YouTube account info."""
@@ -79,49 +527,8 @@ class DownloaderService:
         opts["extract_flat"] = True
         opts["playlist_items"] = "1"  # Only get first item to speed up
 
-        def _verify():
-            try:
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    # Try to access the user's "Watch Later" playlist - requires authentication
-                    # This is faster than subscriptions feed
-                    info = ydl.extract_info(
-                        "https://www.youtube.com/playlist?list=WL",
-                        download=False,
-                    )
-                    # If we get here without error, cookies are valid
-                    return {
-                        "valid": True,
-                        "has_cookies": True,
-                    }
-            except yt_dlp.utils.DownloadError as e:
-                error_msg = str(e)
-                # Check for common auth failure messages
-                if any(msg in error_msg.lower() for msg in ["sign in", "login", "private", "cookies"]):
-                    return {
-                        "valid": False,
-                        "error": "Cookies expired or invalid - please re-export from browser",
-                        "has_cookies": True,
-                    }
-                # If we get a different error (like empty playlist), cookies might still be valid
-                if "empty" in error_msg.lower() or "no video" in error_msg.lower():
-                    return {
-                        "valid": True,
-                        "has_cookies": True,
-                    }
-                return {
-                    "valid": False,
-                    "error": error_msg,
-                    "has_cookies": True,
-                }
-            except Exception as e:
-                return {
-                    "valid": False,
-                    "error": str(e),
-                    "has_cookies": True,
-                }
-
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _verify)
+        return await loop.run_in_executor(self._metadata_executor, _ydl_verify_cookies, opts)
 
     def _get_ydl_opts(
         self,
@@ -129,7 +536,7 @@ class DownloaderService:
         progress_callback: Optional[Callable] = None,
         download_id: Optional[int] = None,
     ) -> dict:
-        output_path = settings.downloads_dir / options.output_template
+        output_path = DOWNLOADS_DIR / options.output_template
 
         opts = self._get_base_opts()
         opts.update({
@@ -143,18 +550,16 @@ class DownloaderService:
         opts["postprocessors"] = []
 
         # Handle output format conversion
-        audio_formats = ["mp3", "m4a", "opus", "flac", "wav", "aac"]
-        video_formats = ["mp4", "mkv", "webm", "avi", "mov"]
         output_format = options.output_format.lower()
 
-        if output_format in audio_formats:
+        if output_format in AUDIO_FORMATS:
             # Audio extraction/conversion
             opts["postprocessors"].append({
                 "key": "FFmpegExtractAudio",
                 "preferredcodec": output_format,
                 "preferredquality": "0",  # Best quality
             })
-        elif output_format in video_formats and output_format != "original":
+        elif output_format in VIDEO_FORMATS:
             # Video format conversion
             opts["postprocessors"].append({
                 "key": "FFmpegVideoConvertor",
@@ -170,7 +575,7 @@ class DownloaderService:
 
         if options.subtitles:
             opts["writesubtitles"] = True
-            opts["subtitleslangs"] = options.subtitle_langs
+            opts["subtitleslangs"] = list(options.subtitle_langs)
 
         if progress_callback:
             opts["progress_hooks"] = [
@@ -187,7 +592,7 @@ class DownloaderService:
     ) -> None:
         try:
             # Check cancel flag first - raise exception to stop download
-            if download_id and self._cancel_flags.get(download_id):
+            if download_id and self._is_cancelled(download_id):
                 logger.info(f"Download {download_id} cancelled via progress hook")
                 raise yt_dlp.utils.DownloadCancelled("Download cancelled by user")
 
@@ -198,26 +603,17 @@ class DownloaderService:
 
                 speed = d.get("speed")
                 if speed:
-                    if speed > 1024 * 1024:
-                        speed_str = f"{speed / 1024 / 1024:.1f} MB/s"
-                    elif speed > 1024:
-                        speed_str = f"{speed / 1024:.1f} KB/s"
+                    if speed > _MB:
+                        speed_str = f"{speed / _MB:.1f} MB/s"
+                    elif speed > _KB:
+                        speed_str = f"{speed / _KB:.1f} KB/s"
                     else:
                         speed_str = f"{speed:.0f} B/s"
                 else:
                     speed_str = None
 
                 eta = d.get("eta")
-                if eta:
-                    eta = int(eta)
-                    mins, secs = divmod(eta, 60)
-                    hours, mins = divmod(mins, 60)
-                    if hours > 0:
-                        eta_str = f"{hours}:{mins:02d}:{secs:02d}"
-                    else:
-                        eta_str = f"{mins}:{secs:02d}"
-                else:
-                    eta_str = None
+                eta_str = _format_duration(int(eta)) if eta else None
 
                 callback(
                     {
@@ -260,7 +656,7 @@ class DownloaderService:
             logger.info(f"[Postprocessor Hook] Download {download_id}: {d}")
 
             # Check cancel flag
-            if download_id and self._cancel_flags.get(download_id):
+            if download_id and self._is_cancelled(download_id):
                 logger.info(f"Download {download_id} cancelled via postprocessor hook")
                 raise yt_dlp.utils.DownloadCancelled("Download cancelled by user")
 
@@ -269,15 +665,7 @@ class DownloaderService:
 
             if status in ("started", "processing"):
                 # Map postprocessor names to user-friendly descriptions
-                pp_names = {
-                    "Merger": "Merging video and audio",
-                    "FFmpegVideoConvertor": "Converting video format",
-                    "FFmpegExtractAudio": "Extracting audio",
-                    "FFmpegMetadata": "Embedding metadata",
-                    "EmbedThumbnail": "Embedding thumbnail",
-                    "FFmpegEmbedSubtitle": "Embedding subtitles",
-                }
-                description = pp_names.get(postprocessor, f"Processing ({postprocessor})")
+                description = POSTPROCESSOR_NAMES.get(postprocessor, f"Processing ({postprocessor})")
 
                 callback(
                     {
@@ -310,18 +698,14 @@ class DownloaderService:
         opts = self._get_base_opts()
         opts["extract_flat"] = "in_playlist"
 
-        def _extract():
-            # Check for cancellation before starting
-            if download_id and self._cancel_flags.get(download_id):
-                raise Exception("Download cancelled")
-
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                return ydl.extract_info(url, download=False)
+        # Check for cancellation before starting
+        if download_id and self._is_cancelled(download_id):
+            raise Exception("Download cancelled")
 
         loop = asyncio.get_event_loop()
         try:
             return await asyncio.wait_for(
-                loop.run_in_executor(None, _extract),
+                loop.run_in_executor(self._metadata_executor, _ydl_extract, opts, url),
                 timeout=timeout
             )
         except asyncio.TimeoutError:
@@ -329,67 +713,28 @@ class DownloaderService:
             raise Exception(f"Info extraction timed out after {timeout} seconds")
 
     async def get_playlist_entries(
-        self, url: str, downloaded_video_ids: set[str]
-    ) -> tuple[str, list[PlaylistEntry]]:
-        """Get all entries from a playlist/channel."""
+        self, url: str, downloaded_video_ids: AbstractSet[str] = frozenset()
+    ) -> tuple[str, list[PlaylistItem]]:
+        """
+        Get all entries from a playlist/channel.
+
+        Entries are converted to PlaylistItems on the worker thread, so the
+        raw yt-dlp entry dicts are released there and large playlists don't
+        tie up the event loop.
+        """
         opts = self._get_base_opts()
         opts.update({
             "extract_flat": True,
             "ignoreerrors": True,
+            # Collect entries as they are received, without the extra
+            # full-size copies yt-dlp makes of an eagerly resolved playlist
+            "lazy_playlist": True,
         })
 
-        def _extract():
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                return ydl.extract_info(url, download=False)
-
         loop = asyncio.get_event_loop()
-        info = await loop.run_in_executor(None, _extract)
-
-        entries = []
-        for entry in info.get("entries", []):
-            if entry is None:
-                continue
-            video_id = entry.get("id", "")
-            duration = entry.get("duration")
-            duration_string = None
-            if duration:
-                mins, secs = divmod(int(duration), 60)
-                hours, mins = divmod(mins, 60)
-                if hours > 0:
-                    duration_string = f"{hours}:{mins:02d}:{secs:02d}"
-                else:
-                    duration_string = f"{mins}:{secs:02d}"
-
-            # Construct YouTube thumbnail URL if not provided
-            thumbnail = entry.get("thumbnail")
-            if not thumbnail and video_id:
-                thumbnail = f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
-
-            # Check for members-only status
-            availability = entry.get("availability", "")
-            members_only = availability in ("subscriber_only", "needs_premium")
-
-            # Also check title for common members-only indicators as fallback
-            title = entry.get("title", "Unknown")
-            if not members_only and title:
-                title_lower = title.lower()
-                if "(members only)" in title_lower or "[members only]" in title_lower:
-                    members_only = True
-
-            entries.append(
-                PlaylistEntry(
-                    video_id=video_id,
-                    title=title,
-                    duration=duration,
-                    duration_string=duration_string,
-                    thumbnail=thumbnail,
-                    uploader=entry.get("uploader"),
-                    already_downloaded=video_id in downloaded_video_ids,
-                    members_only=members_only,
-                )
-            )
-
-        return info.get("title", "Playlist"), entries
+        return await loop.run_in_executor(
+            self._metadata_executor, _ydl_playlist, opts, url, downloaded_video_ids
+        )
 
     async def download(
         self,
@@ -400,15 +745,19 @@ class DownloaderService:
     ) -> dict:
         """Download a video using subprocess for reliable cancellation."""
         logger.info(f"Starting download {download_id}: {url}")
-        self._cancel_flags[download_id] = False
+        # Fresh state, so a cancel left over from an earlier attempt with
+        # the same ID doesn't stop a retry
+        state = DownloadState()
+        self._downloads[download_id] = state
 
         # Build yt-dlp command
-        output_path = settings.downloads_dir / options.output_template
+        output_path = DOWNLOADS_DIR / options.output_template
         cmd = [
             sys.executable, "-u", "-m", "yt_dlp",  # -u for unbuffered Python output
             "--newline",  # Progress on new lines for parsing
             "--no-colors",
             "--progress",  # Force progress output
+            "--progress-template", PROGRESS_TEMPLATE,
             "-f", options.format,
             "-o", str(output_path),
             "--no-part",  # Avoid rename issues on Windows
@@ -417,17 +766,15 @@ class DownloaderService:
         ]
 
         # Add cookies if available
-        if settings.cookies_path.exists():
+        if self.has_cookies():
             cmd.extend(["--cookies", str(settings.cookies_path)])
 
         # Add postprocessors
-        audio_formats = ["mp3", "m4a", "opus", "flac", "wav", "aac"]
-        video_formats = ["mp4", "mkv", "webm", "avi", "mov"]
         output_format = options.output_format.lower()
 
-        if output_format in audio_formats:
+        if output_format in AUDIO_FORMATS:
             cmd.extend(["-x", "--audio-format", output_format, "--audio-quality", "0"])
-        elif output_format in video_formats and output_format != "original":
+        elif output_format in VIDEO_FORMATS:
             cmd.extend(["--remux-video", output_format])
 
         if options.embed_metadata:
@@ -445,25 +792,18 @@ class DownloaderService:
         logger.info(f"[Download {download_id}] Running command: {' '.join(cmd)}")
 
         loop = asyncio.get_running_loop()
-        current_file = {"path": None}  # Track current file for cleanup
 
         def _run_process():
-            import time as time_module
-
-            # Set environment to disable Python buffering in subprocess
-            env = dict(os.environ)
-            env["PYTHONUNBUFFERED"] = "1"
-
             process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.DEVNULL,  # Don't inherit the server's stdin/console
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                env=env,
+                bufsize=65536,
+                env=self._child_env,
                 creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0,
             )
-            self._active_processes[download_id] = process
+            state.process = process
 
             filename = None
             last_progress_time = 0
@@ -471,160 +811,144 @@ class DownloaderService:
             sent_processing_status = False  # Track if we've sent processing status
             logger.info(f"[Download {download_id}] STATE: Initialized - last_progress_value=0, sent_processing_status=False")
 
-            try:
-                for line in iter(process.stdout.readline, ''):
-                    if not line:
-                        break
+            # Per-line diagnostics are only built when DEBUG is on; this loop
+            # runs for every line yt-dlp prints
+            debug = logger.isEnabledFor(logging.DEBUG)
+            readline = process.stdout.readline
+            is_cancelled = state.cancel.is_set
 
-                    line = line.strip()
+            try:
+                for raw_line in iter(readline, b''):
+                    line = raw_line.decode("utf-8", "replace").strip()
                     if not line:
                         continue
 
                     # Check for cancellation
-                    if self._cancel_flags.get(download_id):
+                    if is_cancelled():
                         logger.info(f"[Download {download_id}] Cancellation detected, terminating process")
                         self._terminate_process(process)
-                        return {"cancelled": True, "partial_file": current_file["path"]}
+                        return {"cancelled": True, "partial_file": state.current_file}
 
                     # Log all lines for debugging
-                    logger.info(f"[Download {download_id}] yt-dlp: {line}")
+                    if debug:
+                        logger.debug(f"[Download {download_id}] yt-dlp: {line}")
 
                     # Parse destination file
                     if "[download] Destination:" in line:
-                        current_file["path"] = line.split("Destination:", 1)[1].strip()
-                        self._current_files[download_id] = current_file["path"]
-                        logger.info(f"[Download {download_id}] Set destination: {current_file['path']}")
-
-                    # Parse progress line: "[download]  45.2% of 100.00MiB at 5.23MiB/s ETA 00:30"
-                    elif "[download]" in line and "%" in line:
-                        try:
-                            # Extract percentage
-                            match = re.search(r'(\d+\.?\d*)%', line)
-                            if match:
-                                progress = float(match.group(1))
-                                # Log at INFO when progress >= 99 to help debug premature processing status
-                                if progress >= 99:
-                                    logger.info(f"[Download {download_id}] PARSE: Extracted {progress:.1f}% from line: {line}")
-
-                                # Extract speed (handles both "at X" and "~X" formats)
-                                speed_match = re.search(r'(?:at|~)\s*([\d.]+\s*\w+/s)', line)
-                                speed = speed_match.group(1) if speed_match else None
-
-                                # Extract ETA
-                                eta_match = re.search(r'ETA\s+(\d+:\d+(?::\d+)?)', line)
-                                eta = eta_match.group(1) if eta_match else None
-
-                                # Detect if a new stream started (progress dropped significantly)
-                                # This happens with bestvideo+bestaudio downloads
-                                if progress < 50 and last_progress_value > 90:
-                                    logger.info(f"[Download {download_id}] STATE: New stream detected (progress dropped from {last_progress_value:.1f}% to {progress:.1f}%), resetting sent_processing_status to False")
-                                    sent_processing_status = False  # Reset so we can trigger after this stream
-
-                                # Log state at INFO level when progress is high to debug premature processing
-                                if progress >= 90:
-                                    logger.info(f"[Download {download_id}] STATE: progress={progress:.1f}%, last_progress_value={last_progress_value:.1f}%, sent_processing_status={sent_processing_status}")
-                                last_progress_value = progress
-
-                                # Throttle callbacks
-                                current_time = time_module.time()
-                                should_update = current_time - last_progress_time >= 0.5 or progress >= 99
-                                if progress_callback and should_update:
-                                    last_progress_time = current_time
-                                    logger.info(f"[Download {download_id}] Progress: {progress:.1f}% Speed: {speed} ETA: {eta}")
-                                    try:
-                                        # When download hits 100%, switch to processing status
-                                        # Only if we haven't already (handles multi-stream downloads)
-                                        # For fragmented downloads, check if all fragments are complete
-                                        frag_match = re.search(r'\(frag\s+(\d+)/(\d+)\)', line)
-                                        is_final_fragment = True
-                                        if frag_match:
-                                            current_frag = int(frag_match.group(1))
-                                            total_frags = int(frag_match.group(2))
-                                            is_final_fragment = (current_frag >= total_frags)
-
-                                        if progress >= 99.9 and not sent_processing_status and is_final_fragment:
-                                            logger.info(f"[Download {download_id}] STATE CHANGE: Triggering PROCESSING status (progress={progress:.1f}%, sent_processing_status was False)")
-                                            sent_processing_status = True
-                                            progress_callback({
-                                                "status": "processing",
-                                                "progress": 100,
-                                                "processing_step": "Processing...",
-                                            })
-                                        elif not sent_processing_status:
-                                            # Only send progress if we haven't switched to processing
-                                            progress_callback({
-                                                "progress": progress,
-                                                "speed": speed,
-                                                "eta": eta,
-                                            })
-                                    except Exception as cb_error:
-                                        logger.error(f"[Download {download_id}] Callback error: {cb_error}")
-                        except (ValueError, IndexError) as e:
-                            logger.debug(f"[Download {download_id}] Progress parse error: {e}")
-
-                    # Detect post-processing steps (update description if we see specific messages)
-                    elif line.startswith("[") and progress_callback:
-                        # Map yt-dlp postprocessor names to user-friendly descriptions
-                        pp_patterns = {
-                            "[Merger]": "Merging video and audio",
-                            "[FFmpegVideoConvertor]": "Converting video format",
-                            "[ExtractAudio]": "Extracting audio",
-                            "[FFmpegMetadata]": "Embedding metadata",
-                            "[EmbedThumbnail]": "Embedding thumbnail",
-                            "[FFmpegEmbedSubtitle]": "Embedding subtitles",
-                            "[FFmpegVideoRemuxer]": "Remuxing video",
-                            "[MoveFiles]": "Moving files",
-                            "[ModifyChapters]": "Processing chapters",
-                            "[SponsorBlock]": "Processing sponsor segments",
-                        }
-
-                        for pattern, description in pp_patterns.items():
-                            if line.startswith(pattern):
-                                logger.info(f"[Download {download_id}] STATE CHANGE: Postprocessor detected '{pattern}', setting sent_processing_status=True")
-                                sent_processing_status = True  # Mark as sent
-                                logger.info(f"[Download {download_id}] Postprocessing: {description}")
-                                try:
+                        state.current_file = line.split("Destination:", 1)[1].strip()
+                        logger.info(f"[Download {download_id}] Set destination: {state.current_file}")
+
+                    # Parse progress, either a JSON line from the progress
+                    # template or a text line such as
+                    # "[download]  45.2% of 100.00MiB at 5.23MiB/s ETA 00:30"
+                    elif (parsed := _parse_progress(line)) is not None:
+                        progress, speed, eta, is_final_fragment, output_file = parsed
+                        # With --print yt-dlp doesn't announce destinations,
+                        # so the file being written comes from the progress
+                        if output_file and output_file != state.current_file:
+                            state.current_file = output_file
+                            logger.info(f"[Download {download_id}] Set destination: {output_file}")
+                        # Log when progress >= 99 to help debug premature processing status
+                        if debug and progress >= 99:
+                            logger.debug(f"[Download {download_id}] PARSE: Extracted {progress:.1f}% from line: {line}")
+
+                        # Detect if a new stream started (progress dropped significantly)
+                        # This happens with bestvideo+bestaudio downloads
+                        if progress < 50 and last_progress_value > 90:
+                            logger.info(f"[Download {download_id}] STATE: New stream detected (progress dropped from {last_progress_value:.1f}% to {progress:.1f}%), resetting sent_processing_status to False")
+                            sent_processing_status = False  # Reset so we can trigger after this stream
+
+                        # Log state when progress is high to debug premature processing
+                        if debug and progress >= 90:
+                            logger.debug(f"[Download {download_id}] STATE: progress={progress:.1f}%, last_progress_value={last_progress_value:.1f}%, sent_processing_status={sent_processing_status}")
+                        last_progress_value = progress
+
+                        # Throttle callbacks
+                        current_time = time.time()
+                        should_update = current_time - last_progress_time >= 0.5 or progress >= 99
+                        if progress_callback and should_update:
+                            last_progress_time = current_time
+                            if debug:
+                                logger.debug(f"[Download {download_id}] Progress: {progress:.1f}% Speed: {speed} ETA: {eta}")
+                            try:
+                                # When download hits 100%, switch to processing status
+                                # Only if we haven't already (handles multi-stream downloads)
+                                # For fragmented downloads, check if all fragments are complete
+                                if progress >= 99.9 and not sent_processing_status and is_final_fragment:
+                                    logger.info(f"[Download {download_id}] STATE CHANGE: Triggering PROCESSING status (progress={progress:.1f}%, sent_processing_status was False)")
+                                    sent_processing_status = True
                                     progress_callback({
                                         "status": "processing",
                                         "progress": 100,
-                                        "processing_step": description,
+                                        "processing_step": "Processing...",
+                                    })
+                                elif not sent_processing_status:
+                                    # Only send progress if we haven't switched to processing
+                                    progress_callback({
+                                        "progress": progress,
+                                        "speed": speed,
+                                        "eta": eta,
                                     })
-                                except Exception as cb_error:
-                                    logger.error(f"[Download {download_id}] Processing callback error: {cb_error}")
-                                break
-
-                    # Capture final filepath from --print
-                    if line and not line.startswith("[") and Path(line).suffix:
-                        # This might be the final filepath from --print
-                        if Path(line).exists() or "%" not in line:
+                            except Exception as cb_error:
+                                logger.error(f"[Download {download_id}] Callback error: {cb_error}")
+
+                    # Detect post-processing steps (update description if we see specific messages)
+                    elif line.startswith("[") and progress_callback:
+                        # Look the line's [Tag] up in the postprocessor table
+                        tag = line[:line.find("]") + 1]
+                        description = POSTPROCESSOR_STEPS.get(tag)
+                        if description is not None:
+                            logger.info(f"[Download {download_id}] STATE CHANGE: Postprocessor detected '{tag}', setting sent_processing_status=True")
+                            sent_processing_status = True  # Mark as sent
+                            logger.info(f"[Download {download_id}] Postprocessing: {description}")
+                            try:
+                                progress_callback({
+                                    "status": "processing",
+                                    "progress": 100,
+                                    "processing_step": description,
+                                })
+                            except Exception as cb_error:
+                                logger.error(f"[Download {download_id}] Processing callback error: {cb_error}")
+
+                    # Capture final filepath from --print. It is always under the
+                    # downloads directory, so plain string checks rule out other
+                    # lines before a Path is built or the file is stat'ed
+                    if line[0] not in "[{" and ("/" in line or "\\" in line) and "." in line:
+                        path = Path(line)
+                        if path.suffix and ("%" not in line or path.exists()):
                             filename = line
 
-                process.wait()
+                # Output ends when yt-dlp exits, so this rarely waits; a
+                # process that closed its output but hangs is stopped
+                try:
+                    process.wait(timeout=PROCESS_EXIT_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    logger.warning(f"[Download {download_id}] yt-dlp still running {PROCESS_EXIT_TIMEOUT}s after its output ended, terminating")
+                    self._terminate_process(process)
 
-                if self._cancel_flags.get(download_id):
-                    return {"cancelled": True, "partial_file": current_file["path"]}
+                if state.cancel.is_set():
+                    return {"cancelled": True, "partial_file": state.current_file}
 
                 if process.returncode == 0:
-                    return {"success": True, "filename": filename or current_file["path"]}
+                    return {"success": True, "filename": filename or state.current_file}
                 else:
-                    return {"success": False, "error": f"yt-dlp exited with code {process.returncode}", "partial_file": current_file["path"]}
+                    return {"success": False, "error": f"yt-dlp exited with code {process.returncode}", "partial_file": state.current_file}
 
             except Exception as e:
                 logger.error(f"[Download {download_id}] Process error: {e}")
-                return {"success": False, "error": str(e), "partial_file": current_file["path"]}
+                return {"success": False, "error": str(e), "partial_file": state.current_file}
             finally:
-                if download_id in self._active_processes:
-                    del self._active_processes[download_id]
+                state.process = None
 
         try:
-            result = await loop.run_in_executor(None, _run_process)
+            result = await loop.run_in_executor(self._download_executor, _run_process)
 
             if result.get("cancelled"):
                 logger.info(f"[Download {download_id}] Download was cancelled")
                 # Clean up partial file
                 partial_file = result.get("partial_file")
                 if partial_file:
-                    self._cleanup_partial_file(partial_file)
+                    await self._cleanup(None, partial_file, False)
                 return {"success": False, "error": "Download cancelled", "cancelled": True}
             elif result.get("success"):
                 logger.info(f"[Download {download_id}] Download completed successfully")
@@ -637,73 +961,55 @@ class DownloaderService:
                 partial_file = result.get("partial_file")
                 if partial_file:
                     logger.info(f"[Download {download_id}] Download failed, cleaning up partial files")
-                    self._cleanup_partial_file(partial_file)
                 # Also check for any .ytdl markers
-                self._cleanup_recent_partial_files()
+                await self._cleanup(None, partial_file, True)
                 return {"success": False, "error": result.get("error", "Unknown error")}
 
         except asyncio.CancelledError:
             logger.info(f"[Download {download_id}] Task was cancelled")
-            if download_id in self._active_processes:
-                self._terminate_process(self._active_processes[download_id])
-            # Clean up partial file
-            if current_file["path"]:
-                self._cleanup_partial_file(current_file["path"])
+            # Also stops the reader thread if the process hasn't started yet
+            state.cancel.set()
+            # Stop the process and clean up its partial file off the loop
+            await self._cleanup(state.process, state.current_file, False)
             return {"success": False, "error": "Download cancelled", "cancelled": True}
         except Exception as e:
             logger.error(f"[Download {download_id}] Error: {e}")
             # Clean up partial files on exception
-            if current_file["path"]:
+            if state.current_file:
                 logger.info(f"[Download {download_id}] Exception occurred, cleaning up partial files")
-                self._cleanup_partial_file(current_file["path"])
-            self._cleanup_recent_partial_files()
+            await self._cleanup(None, state.current_file, True)
             return {"success": False, "error": str(e)}
         finally:
-            if download_id in self._cancel_flags:
-                del self._cancel_flags[download_id]
-            if download_id in self._active_processes:
-                del self._active_processes[download_id]
-            if download_id in self._current_files:
-                del self._current_files[download_id]
+            if self._downloads.get(download_id) is state:
+                del self._downloads[download_id]
 
     def _cleanup_partial_file(self, filepath: str):
-        """Clean up a partially downloaded file and all related files."""
+        """
+        Clean up a partially downloaded file and all related files.
+
+        Blocking; the process that wrote the file must already have exited.
+        """
         if not filepath:
             return
 
         try:
-            path = Path(filepath)
             logger.info(f"Attempting to clean up: {filepath}")
 
-            # Wait a moment for the process to fully release the file
-            import time
-            time.sleep(0.5)
-
             # Get the base name to find all related files
             # e.g., "video.mp4" -> "video"
-            base_name = path.stem
-            parent_dir = path.parent
-
-            if parent_dir.exists():
-                # Delete all files that start with the base name
-                self._delete_files_by_basename(parent_dir, base_name)
-
-                # Also check for .part files and fragment files
-                # yt-dlp may create files like: video.f137.mp4, video.f140.m4a, etc.
-                for pattern in [f"{base_name}.f*", f"{base_name}*.part", f"{base_name}*.temp"]:
-                    for file_path in parent_dir.glob(pattern):
-                        if file_path.is_file():
-                            logger.info(f"Deleting temp/fragment file: {file_path}")
-                            try:
-                                file_path.unlink()
-                            except Exception as e:
-                                logger.error(f"Failed to delete {file_path}: {e}")
+            parent_dir, name = os.path.split(filepath)
+            base_name = os.path.splitext(name)[0]
+
+            # Delete all files that start with the base name. This includes
+            # yt-dlp's .part and .temp files and per-format streams such as
+            # video.f137.mp4 and video.f140.m4a
+            self._delete_files_by_basename(parent_dir or ".", base_name)
 
         except Exception as e:
             logger.error(f"Error cleaning up partial file {filepath}: {e}")
 
     def _terminate_process(self, process: subprocess.Popen):
-        """Terminate a subprocess."""
+        """Terminate a subprocess and wait for it to exit."""
         try:
             if sys.platform == "win32":
                 # On Windows, use taskkill to kill the process tree
@@ -714,7 +1020,7 @@ class DownloaderService:
             else:
                 import signal
                 process.send_signal(signal.SIGTERM)
-                process.wait(timeout=5)
+            process.wait(timeout=5)
         except Exception as e:
             logger.error(f"Error terminating process: {e}")
             try:
@@ -722,108 +1028,270 @@ class DownloaderService:
             except:
                 pass
 
-    def cancel_download(self, download_id: int) -> None:
-        """Request cancellation of a download."""
-        logger.info(f"Cancelling download {download_id}")
-        self._cancel_flags[download_id] = True
+    def _stop_and_cleanup(
+        self,
+        process: Optional[subprocess.Popen],
+        filepath: Optional[str],
+        scan_markers: bool,
+    ) -> None:
+        """
+        Stop a download's process and delete what it left behind.
 
-        # Get filepath before killing process
-        filepath = self._current_files.get(download_id)
+        Blocking; run it in an executor. Cleanup starts as soon as the
+        process has exited rather than after a fixed delay.
 
-        # Kill the subprocess if running
-        if download_id in self._active_processes:
-            process = self._active_processes[download_id]
-            logger.info(f"[Download {download_id}] Killing subprocess PID {process.pid}")
+        Args:
+            process: yt-dlp process to terminate, if still running.
+            filepath: Partial output file to clean up, if known.
+            scan_markers: Also clean up files marked incomplete by .ytdl files.
+        """
+        if process is not None:
             self._terminate_process(process)
-
-        # Wait a moment for process to fully terminate and release files
-        import time
-        time.sleep(1)
-
-        # Clean up partial files
         if filepath:
-            logger.info(f"[Download {download_id}] Cleaning up file: {filepath}")
             self._cleanup_partial_file(filepath)
-            if download_id in self._current_files:
-                del self._current_files[download_id]
+        if scan_markers:
+            self._cleanup_recent_partial_files()
 
-        # Also search for any recently created files in downloads directory
-        self._cleanup_recent_partial_files()
+    async def _cleanup(
+        self,
+        process: Optional[subprocess.Popen],
+        filepath: Optional[str],
+        scan_markers: bool,
+    ) -> None:
+        """
+        Run _stop_and_cleanup in the default executor.
+
+        At most CLEANUP_CONCURRENCY cleanups run at once, so cancelling many
+        downloads together doesn't start a directory walk for each of them
+        in parallel. A marker sweep requested less than
+        CLEANUP_SWEEP_INTERVAL seconds after the last one is skipped and one
+        trailing sweep is scheduled instead, so cancelling several downloads
+        in a row walks the tree at most twice.
+        """
+        async with self._cleanup_slots:
+            loop = asyncio.get_running_loop()
+            if scan_markers:
+                wait = self._last_sweep_at + CLEANUP_SWEEP_INTERVAL - time.monotonic()
+                if wait > 0:
+                    logger.debug("Deferring partial file sweep, last one was too recent")
+                    scan_markers = False
+                    if self._trailing_sweep is None:
+                        self._trailing_sweep = loop.call_later(wait, self._start_trailing_sweep)
+                else:
+                    # Claimed before the walk starts, so a second cleanup
+                    # running alongside this one defers its sweep too
+                    self._last_sweep_at = time.monotonic()
+            await loop.run_in_executor(
+                None, self._stop_and_cleanup, process, filepath, scan_markers
+            )
 
-    def _cleanup_recent_partial_files(self):
-        """Clean up any .ytdl files and all related files with the same base name."""
-        try:
-            downloads_dir = settings.downloads_dir
-            if not downloads_dir.exists():
-                return
+    def _start_trailing_sweep(self) -> None:
+        """Run the marker sweep that was deferred by _cleanup."""
+        self._trailing_sweep = None
+        self._trailing_sweep_task = asyncio.create_task(self._cleanup(None, None, True))
 
-            # Search recursively for .ytdl files (these indicate incomplete downloads)
-            for ytdl_file in downloads_dir.rglob("*.ytdl"):
-                logger.info(f"Found incomplete download marker: {ytdl_file}")
+    async def cancel_download(self, download_id: int) -> None:
+        """
+        Request cancellation of a download.
 
-                # The video file is the .ytdl filename without the .ytdl extension
-                # e.g., "video.mp4.ytdl" -> "video.mp4"
-                video_file = Path(str(ytdl_file)[:-5])  # Remove ".ytdl"
+        Only downloads that have started are tracked here. A queued download
+        is stopped by cancelling its task, and finished or unknown IDs have
+        nothing to cancel, so no record is created for them.
+        """
+        logger.info(f"Cancelling download {download_id}")
+        state = self._downloads.get(download_id)
+        if state is None:
+            return
+        state.cancel.set()
 
-                # Get the base name without extension to find all related files
-                # e.g., "video.mp4" -> "video"
-                base_name = video_file.stem
-                parent_dir = video_file.parent
+        # Get filepath before killing process
+        filepath = state.current_file
+        process = state.process
+        if process is not None:
+            logger.info(f"[Download {download_id}] Killing subprocess PID {process.pid}")
+        if filepath:
+            logger.info(f"[Download {download_id}] Cleaning up file: {filepath}")
 
-                # Delete all files that start with the base name
-                self._delete_files_by_basename(parent_dir, base_name)
+        # Kill the subprocess, then clean up partial files and any recently
+        # created ones in the downloads directory
+        await self._cleanup(process, filepath, True)
 
-                # Delete the .ytdl marker file
-                try:
-                    if ytdl_file.exists():
-                        ytdl_file.unlink()
-                        logger.info(f"Deleted .ytdl marker: {ytdl_file}")
-                except Exception as e:
-                    logger.error(f"Failed to delete {ytdl_file}: {e}")
+    def _cleanup_recent_partial_files(self):
+        """
+        Clean up any .ytdl files and all related files with the same base name.
+
+        Blocking. Callers go through _cleanup, which limits how often it runs.
+        """
+        try:
+            # Fragmented downloads that are still running have .ytdl markers
+            # and fragment files too; anything under their prefixes is left
+            # alone
+            active = self._running_download_prefixes()
+
+            # One walk of the downloads tree; the related files of each
+            # .ytdl marker (these indicate incomplete downloads) are
+            # matched against the listing of its directory from that same
+            # walk. Each directory's files start being deleted while the walk
+            # goes on.
+            pending = []
+            marker_paths = set()
+            for dirpath, dirnames, filenames in os.walk(DOWNLOADS_DIR):
+                # yt-dlp doesn't write into hidden directories, so they (and
+                # symlinked directories, which os.walk doesn't follow) are
+                # never descended into
+                dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+
+                markers = [name for name in filenames if name.endswith(_PARTIAL_SUFFIXES)]
+                if not markers:
+                    continue
+
+                abs_dir = os.path.abspath(dirpath)
+                base_names = []
+                for marker in markers:
+                    if os.path.join(abs_dir, marker).startswith(active):
+                        continue
+
+                    # The video file is the marker filename without its
+                    # .ytdl extension, and its base name is used to find all
+                    # related files
+                    # e.g., "video.mp4.ytdl" -> "video.mp4" -> "video"
+                    base_name = os.path.splitext(marker[:marker.rindex(".")])[0]
+                    marker_path = os.path.join(dirpath, marker)
+                    marker_paths.add(marker_path)
+                    logger.info(f"Found incomplete download marker: {marker_path}")
+                    base_names.append(base_name)
+                if not base_names:
+                    continue
+
+                # One pass over the directory for all of its markers: every
+                # file that starts with one of the base names goes, which
+                # includes the markers themselves
+                prefixes = tuple(base_names)
+                targets = []
+                for name in filenames:
+                    if name.startswith(prefixes) and not os.path.join(abs_dir, name).startswith(active):
+                        file_path = os.path.join(dirpath, name)
+                        if not name.endswith(_PARTIAL_SUFFIXES):
+                            logger.info(f"Deleting related file: {file_path}")
+                        targets.append(file_path)
+                pending.extend(self._start_unlinks(targets))
+
+            for file_path in self._finish_unlinks(pending):
+                if file_path in marker_paths:
+                    logger.info(f"Deleted incomplete download marker: {file_path}")
 
         except Exception as e:
             logger.error(f"Error in _cleanup_recent_partial_files: {e}")
+        finally:
+            self._last_sweep_at = time.monotonic()
 
-    def _delete_files_by_basename(self, directory: Path, base_name: str):
-        """Delete all files in a directory that match the base name."""
-        if not directory.exists():
-            return
+    def _running_download_prefixes(self) -> tuple[str, ...]:
+        """
+        Get the path prefixes of the files of downloads still running.
 
+        Each prefix is the absolute current output path without its
+        extension or yt-dlp's ".f<format id>" part, so it covers the other
+        streams of the same download as well as its .ytdl marker and
+        fragment files such as "video.f137.mp4.part-Frag3".
+        """
+        prefixes = []
+        for state in list(self._downloads.values()):
+            if not state.current_file or state.process is None or state.process.poll() is not None:
+                continue
+            stem = os.path.splitext(os.path.abspath(state.current_file))[0]
+            root, format_part = os.path.splitext(stem)
+            prefixes.append(root if format_part.startswith(".f") else stem)
+        return tuple(prefixes)
+
+    def _delete_files_by_basename(self, directory: str, base_name: str):
+        """Delete all files in a directory whose names start with the base name."""
         try:
-            # Find all files that start with the base name
-            for file_path in directory.glob(f"{base_name}*"):
-                if file_path.is_file():
-                    logger.info(f"Deleting related file: {file_path}")
-                    try:
-                        file_path.unlink()
-                    except Exception as e:
-                        logger.error(f"Failed to delete {file_path}: {e}")
+            # A plain prefix match on the listing; unlike a glob pattern it
+            # isn't thrown off by titles containing [ ] or other wildcards
+            with os.scandir(directory) as entries:
+                matches = [
+                    entry.path
+                    for entry in entries
+                    if entry.name.startswith(base_name) and entry.is_file()
+                ]
+        except (FileNotFoundError, NotADirectoryError):
+            return
         except Exception as e:
             logger.error(f"Error deleting files by basename {base_name}: {e}")
+            return
+
+        for file_path in matches:
+            logger.info(f"Deleting related file: {file_path}")
+        self._unlink_files(matches)
+
+    def _unlink_files(self, paths: list[str]) -> list[str]:
+        """
+        Delete files in parallel on the unlink pool. Blocking.
+
+        Args:
+            paths: Files to delete.
+
+        Returns:
+            The paths that are now deleted.
+        """
+        return self._finish_unlinks(self._start_unlinks(paths))
+
+    def _start_unlinks(self, paths: list[str]) -> list[tuple[str, Future]]:
+        """
+        Queue files for deletion on the unlink pool without waiting.
+
+        Args:
+            paths: Files to delete.
+
+        Returns:
+            (path, future) pairs to pass to _finish_unlinks.
+        """
+        return [(path, self._unlink_executor.submit(_try_unlink, path)) for path in paths]
+
+    def _finish_unlinks(self, pending: list[tuple[str, Future]]) -> list[str]:
+        """
+        Wait for queued deletions. Blocking.
+
+        Failures are logged per file without stopping the rest; a file
+        that is already gone counts as deleted.
+
+        Args:
+            pending: (path, future) pairs from _start_unlinks.
+
+        Returns:
+            The paths that are now deleted.
+        """
+        deleted = []
+        for path, future in pending:
+            error = future.result()
+            if error is None:
+                deleted.append(path)
+            else:
+                logger.error(f"Failed to delete {path}: {error}")
+        return deleted
 
     async def get_formats(self, url: str) -> list[dict]:
-        """Get available formats for a URL."""
-        opts = self._get_base_opts()
+        """
+        Get available formats for a URL.
 
-        def _get_formats():
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return info.get("formats", [])
+        Results are reused for FORMATS_CACHE_TTL seconds per URL, so probing
+        the same video again doesn't rerun the extraction.
+        """
+        now = time.monotonic()
+        cached = self._formats_cache.get(url)
+        if cached is not None and now - cached[0] < FORMATS_CACHE_TTL:
+            return cached[1]
+
+        opts = self._get_base_opts()
 
         loop = asyncio.get_event_loop()
-        formats = await loop.run_in_executor(None, _get_formats)
-
-        result = []
-        for f in formats:
-            result.append(
-                {
-                    "format_id": f.get("format_id"),
-                    "ext": f.get("ext"),
-                    "resolution": f.get("resolution") or f"{f.get('width', '?')}x{f.get('height', '?')}",
-                    "filesize": f.get("filesize"),
-                    "format_note": f.get("format_note"),
-                }
-            )
+        result = await loop.run_in_executor(self._metadata_executor, _ydl_formats, opts, url)
+
+        # Drop expired results so URLs probed once don't accumulate
+        for cached_url, (fetched, _) in list(self._formats_cache.items()):
+            if now - fetched >= FORMATS_CACHE_TTL:
+                del self._formats_cache[cached_url]
+        self._formats_cache[url] = (now, result)
         return result
 
 
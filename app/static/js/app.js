@@ -135,7 +135,12 @@ class YtdlApp {
 
         this.ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
-            this.handleWebSocketMessage(data);
+            // The server batches updates into arrays
+            if (Array.isArray(data)) {
+                data.forEach((message) => this.handleWebSocketMessage(message));
+            } else {
+                this.handleWebSocketMessage(data);
+            }
         };
     }
 